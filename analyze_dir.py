@@ -0,0 +1,157 @@
+"""
+Offline bulk skin tone analysis.
+
+Walks a directory, analyzes every image in a process pool and streams one
+JSON record per image to a JSONL file as results complete. Re-running with
+the same output file skips images that already have a result, so an
+interrupted run picks up where it stopped.
+
+Usage:
+    python analyze_dir.py PHOTOS_DIR [-o results.jsonl] [--workers N]
+                          [--max-side 512] [--approximate] [--faces]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, Optional, Set
+
+import cv2
+from dotenv import load_dotenv
+
+# Load environment variables before the settings are read
+load_dotenv()
+
+# Every image is visited once, so caching decoded arrays would only hold
+# memory in each worker
+os.environ.setdefault("ARRAY_CACHE_BYTES", "0")
+
+# Add the current directory to the path to ensure imports work correctly
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError
+from app.core.timing import collect_stage_timings, stage
+from app.services.image_service import ImageService
+from app.services.skin_mask import get_skin_table
+
+logger = logging.getLogger("analyze_dir")
+
+# Analysis options, set in every worker by init_worker
+_options: Dict[str, Any] = {}
+
+
+def find_images(directory: str) -> Iterator[str]:
+    """Yield image files under directory with an allowed extension, in a stable order."""
+    extensions = {f".{ext.lower()}" for ext in settings.allowed_extensions}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in extensions:
+                yield os.path.join(root, name)
+
+
+def load_done(output_path: str) -> Set[str]:
+    """
+    Read the paths that already have a successful result in an output file.
+
+    A partially written last line (from an interrupted run) is ignored, and
+    failed images are retried.
+    """
+    done: Set[str] = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+def init_worker(options: Dict[str, Any]) -> None:
+    """Pool initializer: store the analysis options in the worker process."""
+    # Parallelism comes from the pool; OpenCV's own threads would only
+    # oversubscribe the cores
+    cv2.setNumThreads(1)
+    _options.update(options)
+
+
+def analyze_file(path: str) -> Dict[str, Any]:
+    """Analyze one image in a worker and return its JSONL record."""
+    with collect_stage_timings() as timings:
+        try:
+            with stage("total"):
+                skin_tone, metadata = ImageService.detect_skin_tone(
+                    path,
+                    _options["max_side"],
+                    approximate=_options["approximate"],
+                    faces=_options["faces"],
+                )
+            record = {"path": path, "skin_tone": skin_tone.value, "metadata": metadata}
+        except ApplicationError as e:
+            record = {"path": path, "error": e.message}
+    record["timings"] = dict(timings)
+    return record
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Directory to scan for images (recursively)")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (default: cores)")
+    parser.add_argument("--max-side", type=int, default=None, help="Analysis resolution (default: analysis_max_side)")
+    parser.add_argument("--approximate", action="store_true", help="Use the sampling estimator")
+    parser.add_argument("--faces", action="store_true", help="Restrict statistics to detected faces")
+    parser.add_argument("--chunksize", type=int, default=4, help="Images handed to a worker at a time")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.setLevel(logging.INFO)
+
+    done = load_done(args.output)
+    pending = [path for path in find_images(args.directory) if path not in done]
+    logger.info(f"{len(pending)} image(s) to analyze, {len(done)} already done, {args.workers} worker(s)")
+    if not pending:
+        return 0
+
+    # Build the skin table (composite rules only) before forking so workers share it copy-on-write
+    get_skin_table()
+
+    options = {"max_side": args.max_side, "approximate": args.approximate, "faces": args.faces}
+    stage_totals: Dict[str, float] = defaultdict(float)
+    completed = failed = 0
+    start = time.perf_counter()
+
+    with open(args.output, "a", encoding="utf-8") as output, \
+            Pool(args.workers, initializer=init_worker, initargs=(options,)) as pool:
+        for record in pool.imap_unordered(analyze_file, pending, chunksize=args.chunksize):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+
+            for name, seconds in record["timings"].items():
+                stage_totals[name] += seconds
+            completed += 1
+            failed += "error" in record
+            if completed % 100 == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{completed}/{len(pending)} done, {completed / elapsed:.1f} images/s")
+
+    elapsed = time.perf_counter() - start
+    print(f"Analyzed {completed} image(s) ({failed} failed) in {elapsed:.1f} s: "
+          f"{completed / elapsed:.1f} images/s with {args.workers} worker(s)")
+    print("Stage totals (seconds summed over workers):")
+    for name, seconds in sorted(stage_totals.items(), key=lambda item: -item[1]):
+        print(f"  {name:<12} {seconds:9.2f}  {seconds / completed * 1000:8.1f} ms/image")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
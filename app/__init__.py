@@ -11,15 +11,16 @@ load_dotenv()
 from .core.config import settings
 from .core.logging_config import get_logger
 from .core.error_handling import register_exception_handlers
+from .services.worker_pool import worker_pool
 
 # Initialize main application logger
 logger = get_logger(__name__)
 
 app = FastAPI(
-    title=settings.APP_NAME, # Use setting for title
+    title=settings.app_name, # Use setting for title
     description="Enterprise-ready FastAPI application base.",
     version="1.0.0",
-    debug=settings.DEBUG, # Use setting for debug mode
+    debug=settings.debug, # Use setting for debug mode
     # Add other FastAPI parameters if needed, e.g., lifespan context managers for DB connections
 )
 
@@ -31,6 +32,9 @@ if os.path.exists(static_dir) and os.path.isdir(static_dir):
 else:
     logger.warning(f"Static directory not found at {static_dir}. Create it if you need to serve static files.")
 
+# Serve uploaded and adjusted images at the URLs returned by ImageService.get_image_url
+app.mount("/uploads", StaticFiles(directory=settings.upload_folder), name="uploads")
+
 # Configure Jinja2 templates
 templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
 if os.path.exists(templates_dir) and os.path.isdir(templates_dir):
@@ -64,10 +68,11 @@ async def read_root():
 # --- Startup and Shutdown Events ---
 @app.on_event("startup")
 async def startup_event():
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION} ({settings.APP_ENV})")
+    logger.info(f"Starting {settings.app_name} v{settings.app_version} ({settings.app_env})")
     # Add any startup tasks here (database connections, etc.)
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    logger.info(f"Shutting down {settings.APP_NAME}")
+    logger.info(f"Shutting down {settings.app_name}")
+    worker_pool.shutdown()
     # Add any cleanup tasks here
\ No newline at end of file
@@ -0,0 +1,286 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import RedirectResponse, Response
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError, ErrorCode
+from app.models.color_model import SkinTone, ColorPalette
+from app.services.image_encoder import EncodedImage, EncodeOptions, negotiate_format, parse_format
+from app.services.image_service import ImageService
+from app.services.tone_session import TONE_POSITIONS, tone_sessions
+from app.services.upload_stream import ReceivedUpload, receive_upload
+from app.services.worker_pool import worker_pool
+
+router = APIRouter()
+
+# Tone session renders are not negotiated; JPEG is the fastest encoder for slider updates
+SESSION_RENDER_FORMAT = "jpeg"
+
+
+def parse_skin_tone(value: str) -> SkinTone:
+    """Accept either the enum name ("MEDIUM_DARK") or its label ("Medium Dark")."""
+    for tone in SkinTone:
+        if value in (tone.name, tone.value):
+            return tone
+    raise ApplicationError(
+        f"Unknown skin tone '{value}'",
+        ErrorCode.VALIDATION_ERROR,
+        {"allowed": [tone.name for tone in SkinTone]}
+    )
+
+
+def parse_int_field(fields: Dict[str, str], name: str, default: Optional[int]) -> Optional[int]:
+    """Read an optional integer form field."""
+    value = fields.get(name, "")
+    if value == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ApplicationError(f"Form field '{name}' must be an integer", ErrorCode.VALIDATION_ERROR)
+
+
+def parse_float_field(fields: Dict[str, str], name: str, default: Optional[float]) -> Optional[float]:
+    """Read an optional float form field."""
+    value = fields.get(name, "")
+    if value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ApplicationError(f"Form field '{name}' must be a number", ErrorCode.VALIDATION_ERROR)
+
+
+def parse_bool_field(fields: Dict[str, str], name: str) -> bool:
+    """Read an optional boolean form field ("true"/"false", "1"/"0", "yes"/"no")."""
+    value = fields.get(name, "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return False
+    if value in ("1", "true", "yes", "on"):
+        return True
+    raise ApplicationError(f"Form field '{name}' must be a boolean", ErrorCode.VALIDATION_ERROR)
+
+
+def parse_encode_options(request: Request, fields: Dict[str, str], default_format: Optional[str] = None) -> EncodeOptions:
+    """Read the output encoding from the `format`, `quality`, `progressive` and `target_ssim` fields.
+
+    Without a `format` field the format is negotiated from the Accept header,
+    or is default_format if one is given. With `target_ssim` the quality is
+    searched for instead of fixed.
+    """
+    if default_format:
+        output_format = parse_format(fields.get("format") or default_format)
+    else:
+        output_format = negotiate_format(request.headers.get("accept"), fields.get("format") or None)
+    quality = parse_int_field(fields, "quality", None)
+    if quality is not None and not 1 <= quality <= 100:
+        raise ApplicationError("Form field 'quality' must be between 1 and 100", ErrorCode.VALIDATION_ERROR)
+    progressive = parse_bool_field(fields, "progressive") if "progressive" in fields else None
+    target_ssim = parse_float_field(fields, "target_ssim", None)
+    if target_ssim is not None and not 0 < target_ssim < 1:
+        raise ApplicationError("Form field 'target_ssim' must be between 0 and 1", ErrorCode.VALIDATION_ERROR)
+    return EncodeOptions(output_format, quality, progressive, target_ssim)
+
+
+def encoded_response(encoded: EncodedImage, negotiated: bool = True) -> Response:
+    """Binary response for an encoded image, reporting its encode time in Server-Timing.
+
+    negotiated says whether the format came from the Accept header, which
+    the response then varies on.
+    """
+    headers = {
+        "Cache-Control": "no-store",
+        "Server-Timing": f"encode;dur={encoded.seconds * 1000:.2f}",
+    }
+    if negotiated:
+        headers["Vary"] = "Accept"
+    return Response(content=encoded.data, media_type=encoded.media_type, headers=headers)
+
+
+async def receive_image(request: Request) -> ReceivedUpload:
+    """Stream a multipart image upload, enforcing the size and header limits."""
+    content_length = request.headers.get("content-length")
+    upload = await receive_upload(
+        request.stream(),
+        request.headers.get("content-type"),
+        settings.max_upload_size,
+        int(content_length) if content_length and content_length.isdigit() else None,
+    )
+    # Header-only checks, so bad or oversized images never reach the decoder
+    ImageService.validate_upload(upload.data, upload.filename)
+    return upload
+
+
+@router.post("/analyze")
+async def analyze_image(request: Request):
+    """Detect the skin tone of an uploaded photo and recommend colours for it.
+
+    Expects multipart/form-data with a `file` part and optional `max_side`,
+    `approximate`, `faces` and `subjects` fields; `approximate` estimates
+    lightness from a pixel sample and reports its confidence interval, `faces`
+    restricts the statistics to detected faces and `subjects` adds a result
+    per detected face. The analysis runs in the worker pool so the event loop keeps
+    serving other requests while the image is processed.
+    """
+    upload = await receive_image(request)
+    max_side = parse_int_field(upload.fields, "max_side", None)
+    approximate = parse_bool_field(upload.fields, "approximate")
+    faces = parse_bool_field(upload.fields, "faces") if "faces" in upload.fields else None
+    subjects = parse_bool_field(upload.fields, "subjects")
+
+    skin_tone, metadata = await worker_pool.run(
+        ImageService.detect_skin_tone_from_bytes, upload.data, max_side, upload.sha256, approximate, faces, subjects
+    )
+    return {
+        "skin_tone": skin_tone.value,
+        "metadata": metadata,
+        "recommendations": ColorPalette.get_recommendations(skin_tone),
+    }
+
+
+@router.post("/adjust")
+async def adjust_image(request: Request):
+    """Re-tone the skin in an uploaded photo and return the result's URL.
+
+    Expects multipart/form-data with a `file` part, a `target_tone` field and
+    optional `max_side`, `preview`, `format`, `quality`, `progressive` and
+    `target_ssim` fields. With `preview` the result is rendered at
+    settings.preview_max_side and the response adds a `download_url` that
+    renders the full-resolution image on first request. The output is JPEG,
+    WebP or PNG as `format` or the Accept header asks; with `target_ssim` the
+    smallest quality meeting that SSIM is used. `encoding` reports the
+    format, chosen quality, SSIM, bytes and encode time; a preview already
+    rendered with the same options is reused and reports an encode time of 0.
+    """
+    upload = await receive_image(request)
+    tone = parse_skin_tone(upload.fields.get("target_tone", ""))
+    output = parse_encode_options(request, upload.fields)
+
+    if parse_bool_field(upload.fields, "preview"):
+        preview_path, token, encoding = await worker_pool.run(
+            ImageService.preview_skin_tone_from_bytes, upload.data, upload.filename, tone, upload.sha256, output
+        )
+        return {
+            "target_tone": tone.value,
+            "url": ImageService.get_image_url(preview_path),
+            "token": token,
+            "download_url": f"/api/adjust/render/{token}",
+            "encoding": encoding,
+        }
+
+    max_side = parse_int_field(upload.fields, "max_side", 0)
+    adjusted_path, encoding = await worker_pool.run(
+        ImageService.adjust_skin_tone_from_bytes, upload.data, upload.filename, tone, max_side, output
+    )
+    return {
+        "target_tone": tone.value,
+        "url": ImageService.get_image_url(adjusted_path),
+        "encoding": encoding,
+    }
+
+
+@router.get("/adjust/render/{token}")
+async def render_adjusted(token: str):
+    """Redirect to the full-resolution render behind a preview token, rendering it on first request.
+
+    The render uses the preview request's format, quality, progressive flag
+    and target SSIM, which the token carries.
+    """
+    adjusted_path = await worker_pool.run(ImageService.render_full_resolution, token)
+    return RedirectResponse(ImageService.get_image_url(adjusted_path))
+
+
+@router.post("/adjust/variants")
+async def adjust_variants(request: Request):
+    """Re-tone the skin in an uploaded photo to every target tone at once.
+
+    Expects multipart/form-data with a `file` part and optional `max_side`,
+    `format`, `quality`, `progressive` and `target_ssim` fields. Returns the URL of each
+    variant keyed by tone, and the total bytes and encode time.
+    """
+    upload = await receive_image(request)
+    max_side = parse_int_field(upload.fields, "max_side", 0)
+    output = parse_encode_options(request, upload.fields)
+
+    variant_paths, encoding = await worker_pool.run(
+        ImageService.adjust_skin_tone_variants_from_bytes, upload.data, upload.filename, max_side, output
+    )
+    return {
+        "variants": {
+            tone.value: ImageService.get_image_url(path) for tone, path in variant_paths.items()
+        },
+        "encoding": encoding,
+    }
+
+
+@router.post("/adjust/lut")
+async def adjust_lut(request: Request):
+    """Return the tone transfer /adjust would apply, as a downloadable .cube 3D LUT.
+
+    Expects the same multipart/form-data fields as /adjust; `max_side` sets
+    the resolution the skin statistics are measured at.
+    """
+    upload = await receive_image(request)
+    tone = parse_skin_tone(upload.fields.get("target_tone", ""))
+    max_side = parse_int_field(upload.fields, "max_side", None)
+
+    lut = await worker_pool.run(
+        ImageService.tone_lut_from_bytes, upload.data, upload.filename, tone, max_side
+    )
+    return Response(
+        content=lut.to_cube(f"skin tone: {tone.value}"),
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="skin_tone_{tone.name.lower()}.cube"'},
+    )
+
+
+@router.post("/tone-session")
+async def open_tone_session(request: Request):
+    """Open an interactive re-toning session for an uploaded photo.
+
+    Expects multipart/form-data with a `file` part. The photo is decoded once
+    at settings.preview_max_side and kept resident with its skin pixels, so
+    each slider move only re-tones those pixels. Returns the session id and
+    the slider position of each SkinTone.
+    """
+    upload = await receive_image(request)
+    session = await worker_pool.run(ImageService.tone_session_from_bytes, upload.data, upload.filename)
+    return {
+        "session_id": tone_sessions.create(session),
+        "width": session.image_rgb.shape[1],
+        "height": session.image_rgb.shape[0],
+        "skin_fraction": session.skin_fraction,
+        "tone_positions": {tone.value: position for tone, position in TONE_POSITIONS.items()},
+    }
+
+
+@router.get("/tone-session/{session_id}/render")
+async def render_tone_session(request: Request, session_id: str, position: float):
+    """Return the session's preview re-toned for a slider position (0 = Very Light, 1 = Very Dark).
+
+    Optional `format`, `quality` and `progressive` query parameters choose the
+    encoding. The format is not negotiated from the Accept header: renders are
+    JPEG unless `format` names another, since a browser's Accept header would
+    select WebP, several times slower to encode than a slider update allows.
+    `target_ssim` is rejected; its quality search takes far longer than a
+    slider move. Renders run next to the resident session rather than in the
+    worker pool, since they touch only the skin pixels of a preview and take
+    milliseconds; at most settings.tone_render_limit run at once, and further
+    ones get SERVICE_BUSY.
+    """
+    if not 0 <= position <= 1:
+        raise ApplicationError("position must be between 0 and 1", ErrorCode.VALIDATION_ERROR)
+    fields = dict(request.query_params)
+    if "target_ssim" in fields:
+        raise ApplicationError("target_ssim is not supported for tone session renders", ErrorCode.VALIDATION_ERROR)
+    output = parse_encode_options(request, fields, default_format=SESSION_RENDER_FORMAT)
+    encoded = await tone_sessions.render(session_id, position, output)
+    return encoded_response(encoded, negotiated=False)
+
+
+@router.delete("/tone-session/{session_id}")
+async def close_tone_session(session_id: str):
+    """Release a tone session's resident working set."""
+    if not tone_sessions.close(session_id):
+        raise ApplicationError(f"Tone session '{session_id}' not found or expired", ErrorCode.NOT_FOUND)
+    return {"session_id": session_id, "closed": True}
@@ -2,6 +2,11 @@ from fastapi import APIRouter
 from datetime import datetime
 import os
 
+from app.services.analysis_cache import analysis_cache
+from app.services.array_cache import array_cache
+from app.services.tone_session import tone_sessions
+from app.services.worker_pool import worker_pool
+
 router = APIRouter()
 
 @router.get("/health")
@@ -16,4 +21,14 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "environment": os.getenv("APP_ENV", "development"),
         "version": os.getenv("APP_VERSION", "1.0.0")
-    }
\ No newline at end of file
+    }
+
+@router.get("/health/stats")
+async def health_stats():
+    """Occupancy and hit rates of the worker pool, caches and tone sessions."""
+    return {
+        "worker_pool": worker_pool.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "array_cache": array_cache.stats(),
+        "tone_sessions": tone_sessions.stats(),
+    }
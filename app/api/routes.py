@@ -7,6 +7,10 @@ router = APIRouter()
 from .health import router as health_router
 router.include_router(health_router, tags=["health"])
 
+# Import and include image analysis routes
+from .analysis import router as analysis_router
+router.include_router(analysis_router, tags=["analysis"])
+
 @router.get('/ping')
 async def ping_pong():
     """A simple ping endpoint."""
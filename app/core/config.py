@@ -9,6 +9,8 @@ class AppConfig(BaseSettings):
     
     # Application Settings
     app_name: str = Field(default="Skin Tone Color Advisor", description="Application name")
+    app_version: str = Field(default="1.0.0", description="Application version")
+    app_env: str = Field(default="development", description="Deployment environment")
     debug: bool = Field(default=False, description="Debug mode")
     log_level: str = Field(default="INFO", description="Logging level")
     
@@ -16,6 +18,35 @@ class AppConfig(BaseSettings):
     upload_folder: str = Field(default="uploads", description="Folder for uploaded images")
     max_upload_size: int = Field(default=10 * 1024 * 1024, description="Maximum upload size in bytes (10MB)")
     allowed_extensions: list = Field(default=["jpg", "jpeg", "png"], description="Allowed file extensions")
+    max_image_width: int = Field(default=12000, description="Maximum declared image width in pixels")
+    max_image_height: int = Field(default=12000, description="Maximum declared image height in pixels")
+    max_image_pixels: int = Field(default=40_000_000, description="Maximum declared pixel count (decompression bomb guard)")
+    
+    # Analysis Settings
+    analysis_max_side: int = Field(default=512, description="Longest image side used for skin tone analysis (0 = full resolution)")
+    skin_rule: str = Field(default="hsv", description="Skin segmentation rule: 'hsv', 'ycrcb' or 'hsv+ycrcb'")
+    analysis_cache_size: int = Field(default=256, description="Number of analysis results kept in memory (0 disables caching)")
+    analysis_cache_dir: Optional[str] = Field(default=None, description="Directory for the on-disk analysis cache tier")
+    array_cache_bytes: int = Field(default=128 * 1024 * 1024, description="Memory budget in bytes for cached decoded images and intermediates (0 disables)")
+    sampling_confidence: float = Field(default=0.95, description="Confidence level of the L* interval in approximate analysis")
+    sampling_initial_samples: int = Field(default=1024, description="Pixels drawn in the first round of approximate analysis")
+    sampling_max_samples: int = Field(default=65536, description="Pixel budget after which approximate analysis stops regardless")
+    face_detection: bool = Field(default=False, description="Restrict skin statistics to detected faces when any are found")
+    face_cascade: str = Field(default="haarcascade_frontalface_default.xml", description="Cascade file from cv2.data.haarcascades used for face detection")
+    batch_thumbnail_size: int = Field(default=128, description="Side of the square thumbnails used by batch analysis")
+    preview_max_side: int = Field(default=1080, description="Longest side of skin tone adjustment previews")
+    output_format: str = Field(default="jpeg", description="Format of adjusted images when the request does not choose one: 'jpeg', 'webp' or 'png'")
+    output_quality: int = Field(default=90, description="JPEG/WebP quality (1-100) of adjusted images")
+    output_progressive: bool = Field(default=False, description="Encode adjusted JPEGs as progressive")
+    quality_search_proxy_side: int = Field(default=512, description="Side of the tile mosaic used to search the quality for a target SSIM")
+    tone_session_limit: int = Field(default=8, description="Interactive tone sessions kept resident at once")
+    tone_session_ttl: int = Field(default=900, description="Seconds an idle tone session is kept before it expires")
+    tone_render_limit: int = Field(default=4, description="Tone session renders allowed to run at once; further ones are rejected as busy")
+
+    # Worker Pool Settings
+    worker_pool_kind: str = Field(default="thread", description="Executor for image work: 'thread' or 'process'")
+    worker_pool_size: int = Field(default=1, description="Number of concurrent image processing workers")
+    worker_queue_size: int = Field(default=4, description="Jobs allowed to wait for a worker before requests are rejected")
     
     # Server Settings
     host: str = Field(default="0.0.0.0", description="Server host")
@@ -3,12 +3,29 @@ from enum import Enum
 from typing import Dict, Any, Optional
 import logging
 
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
 class ErrorCode(Enum):
     """Application error codes."""
     VALIDATION_ERROR = "VALIDATION_ERROR"
     PROCESSING_ERROR = "PROCESSING_ERROR"
     FILE_ERROR = "FILE_ERROR"
     IMAGE_PROCESSING_ERROR = "IMAGE_PROCESSING_ERROR"
+    SERVICE_BUSY = "SERVICE_BUSY"
+    UPLOAD_TOO_LARGE = "UPLOAD_TOO_LARGE"
+    NOT_FOUND = "NOT_FOUND"
+
+# HTTP status returned for each error code by the API exception handler
+ERROR_STATUS_CODES = {
+    ErrorCode.VALIDATION_ERROR: 400,
+    ErrorCode.PROCESSING_ERROR: 500,
+    ErrorCode.FILE_ERROR: 500,
+    ErrorCode.IMAGE_PROCESSING_ERROR: 422,
+    ErrorCode.SERVICE_BUSY: 503,
+    ErrorCode.UPLOAD_TOO_LARGE: 413,
+    ErrorCode.NOT_FOUND: 404,
+}
 
 class ApplicationError(Exception):
     """Base application exception."""
@@ -44,6 +61,13 @@ class ErrorHandler:
 
 def register_exception_handlers(app):
     """Register exception handlers with the FastAPI application."""
-    # This function is a placeholder for FastAPI exception handlers
     # For NiceGUI, we'll handle exceptions directly in the request handlers
-    pass
\ No newline at end of file
+
+    @app.exception_handler(ApplicationError)
+    async def application_error_handler(request: Request, error: ApplicationError):
+        headers = {"Retry-After": "1"} if error.error_code == ErrorCode.SERVICE_BUSY else None
+        return JSONResponse(
+            status_code=ERROR_STATUS_CODES.get(error.error_code, 500),
+            content=ErrorHandler.handle_error(error),
+            headers=headers,
+        )
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Opt-in per-stage timing for the image pipeline.
+
+Pipeline code wraps its stages in ``stage("name")``. Time is only recorded
+while the current thread is inside ``collect_stage_timings()``; otherwise a
+stage costs two perf_counter calls.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import DefaultDict, Iterator
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the wall time of the enclosed block to the active collector, if any."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        totals = getattr(_local, "totals", None)
+        if totals is not None:
+            totals[name] += time.perf_counter() - start
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[DefaultDict[str, float]]:
+    """
+    Collect stage timings (in seconds) for work done by this thread.
+
+    Yields:
+        A dict of stage name to accumulated seconds, filled in as stages finish
+    """
+    previous = getattr(_local, "totals", None)
+    totals: DefaultDict[str, float] = defaultdict(float)
+    _local.totals = totals
+    try:
+        yield totals
+    finally:
+        _local.totals = previous
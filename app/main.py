@@ -2,9 +2,9 @@ from fastapi import FastAPI
 from app.core.config import settings
 
 app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
-    debug=settings.DEBUG
+    title=settings.app_name,
+    version=settings.app_version,
+    debug=settings.debug
 )
 
 @app.get("/")
@@ -13,6 +13,30 @@ class SkinTone(Enum):
     DARK = "Dark"
     VERY_DARK = "Very Dark"
 
+# Lower L* bound (exclusive) of each skin tone bucket, lightest first
+LIGHTNESS_THRESHOLDS: List[Tuple[float, SkinTone]] = [
+    (85, SkinTone.VERY_LIGHT),
+    (75, SkinTone.LIGHT),
+    (65, SkinTone.MEDIUM_LIGHT),
+    (55, SkinTone.MEDIUM),
+    (45, SkinTone.MEDIUM_DARK),
+    (35, SkinTone.DARK),
+]
+
+def classify_lightness(lightness: float) -> SkinTone:
+    """Map a CIE L* lightness value to its skin tone category."""
+    for threshold, skin_tone in LIGHTNESS_THRESHOLDS:
+        if lightness > threshold:
+            return skin_tone
+    return SkinTone.VERY_DARK
+
+def classify_lightness_batch(lightness: np.ndarray) -> List[SkinTone]:
+    """Map an array of L* values to skin tones with one searchsorted call."""
+    # Thresholds ascending; searchsorted's left side matches the exclusive bound
+    thresholds = np.array([threshold for threshold, _ in reversed(LIGHTNESS_THRESHOLDS)])
+    tones = [SkinTone.VERY_DARK] + [skin_tone for _, skin_tone in reversed(LIGHTNESS_THRESHOLDS)]
+    return [tones[index] for index in np.searchsorted(thresholds, lightness, side="left")]
+
 class ColorPalette:
     """Color palette recommendations for different skin tones."""
     
@@ -0,0 +1,142 @@
+"""Content-addressed cache of skin tone analysis results."""
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple, Union
+
+from cachetools import LRUCache
+
+from app.core.config import settings
+from app.models.color_model import SkinTone
+
+logger = logging.getLogger(__name__)
+
+AnalysisResult = Tuple[SkinTone, Dict[str, Any]]
+
+
+def content_hash(data: Union[bytes, memoryview]) -> str:
+    """Return the SHA-256 hex digest of an image's encoded bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _json_default(value: Any) -> Any:
+    # NumPy scalars expose .item(); tuples are handled natively as lists
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class AnalysisCache:
+    """
+    Two-tier cache of detect_skin_tone results.
+
+    Entries are keyed by the SHA-256 of the image bytes plus the analysis
+    algorithm version and parameters, so a re-uploaded photo is served without
+    decoding it again. The memory tier is a bounded LRU; the optional disk tier
+    stores one JSON file per key and survives restarts.
+    """
+
+    def __init__(self, max_entries: int, disk_dir: Optional[str] = None):
+        self._memory: LRUCache = LRUCache(maxsize=max(1, max_entries))
+        self._enabled = max_entries > 0
+        self._disk_dir = disk_dir
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(digest: str, version: str, **params: Any) -> str:
+        """Build a cache key from a content hash, algorithm version and parameters."""
+        suffix = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"{digest}:{version}:{suffix}"
+
+    def _disk_path(self, key: str) -> str:
+        # Keys contain ':' and '=', which aren't portable in filenames
+        return os.path.join(self._disk_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[AnalysisResult]:
+        """Look up a result; returns a private copy, or None on a miss."""
+        if not self._enabled:
+            return None
+
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self.hits += 1
+                return result[0], copy.deepcopy(result[1])
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory[key] = result
+        return result[0], copy.deepcopy(result[1])
+
+    def put(self, key: str, result: AnalysisResult):
+        """Store a result in memory and, when configured, on disk."""
+        if not self._enabled:
+            return
+
+        skin_tone, metadata = result
+        stored = (skin_tone, copy.deepcopy(metadata))
+        with self._lock:
+            self._memory[key] = stored
+        self._write_disk(key, stored)
+
+    def _read_disk(self, key: str) -> Optional[AnalysisResult]:
+        if not self._disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return SkinTone[entry["skin_tone"]], entry["metadata"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable analysis cache entry: {str(e)}")
+            return None
+
+    def _write_disk(self, key: str, result: AnalysisResult):
+        if not self._disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"skin_tone": result[0].name, "metadata": result[1]}, f, default=_json_default)
+            # Atomic rename so concurrent readers never see a partial file
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write analysis cache entry: {str(e)}")
+
+    def clear(self):
+        """Drop all in-memory entries and reset the counters."""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and occupancy."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "max_entries": self._memory.maxsize if self._enabled else 0,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+# Process-wide cache instance
+analysis_cache = AnalysisCache(settings.analysis_cache_size, settings.analysis_cache_dir)
@@ -0,0 +1,124 @@
+"""Byte-budgeted cache of decoded images and other per-image intermediates."""
+import logging
+import sys
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+import numpy as np
+from cachetools import LRUCache
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def nbytes(value: Any) -> int:
+    """Memory held by a cached value: array buffers, summed through tuples, lists and object attributes."""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(item) for item in value)
+    if value is None:
+        return 0
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    if hasattr(value, "__dict__"):
+        # Result objects (SkinStats, ColorLUT) are counted by their arrays
+        return sum(nbytes(item) for item in vars(value).values())
+    return sys.getsizeof(value)
+
+
+def _freeze(value: Any) -> Any:
+    # Shared arrays are handed to every caller; make accidental in-place
+    # writes fail loudly instead of corrupting later hits
+    if isinstance(value, np.ndarray):
+        value.setflags(write=False)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            _freeze(item)
+    return value
+
+
+class _BudgetLRU(LRUCache):
+    """LRUCache that counts the entries it evicts to stay within its byte budget."""
+
+    def __init__(self, budget: int):
+        super().__init__(maxsize=budget, getsizeof=nbytes)
+        self.evictions = 0
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.evictions += 1
+        return key, value
+
+
+class ArrayCache:
+    """
+    Process-wide LRU of NumPy intermediates, evicting by size in bytes.
+
+    Entries are keyed by the content hash of the source image plus the name
+    and parameters of what was computed from it, so a decoded 12 MP photo
+    (36 MB) counts 36 MB against the budget while a mean colour counts a few
+    bytes. Values larger than the whole budget are returned but not stored.
+    Cached arrays are read-only.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self._enabled = budget_bytes > 0
+        self._entries = _BudgetLRU(max(1, budget_bytes))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(digest: str, kind: str, **params: Any) -> Hashable:
+        """Build a key from a content hash, the intermediate's name and its parameters."""
+        return (digest, kind) + tuple(sorted(params.items()))
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        compute runs outside the lock, so two threads missing on the same key
+        may both compute it; the last one stored wins.
+        """
+        if not self._enabled:
+            return compute()
+
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = _freeze(compute())
+        with self._lock:
+            try:
+                self._entries[key] = value
+            except ValueError:
+                # Larger than the whole budget
+                logger.debug(f"Not caching {key}: {nbytes(value)} bytes exceeds the budget")
+        return value
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return occupancy in bytes, hit/miss counters and evictions."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._entries.currsize,
+                "budget_bytes": self._entries.maxsize if self._enabled else 0,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self._entries.evictions,
+            }
+
+
+# Process-wide cache instance
+array_cache = ArrayCache(settings.array_cache_bytes)
@@ -0,0 +1,281 @@
+"""
+3D colour lookup tables for skin tone transfer.
+
+The tone transfer in adjust_skin_tone is a function of a pixel's colour alone
+once the per-image HSV factors are known: skin colours get their hue, saturation
+and value scaled, everything else is left as is. That function is sampled on
+a size^3 RGB grid and applied to the image with trilinear interpolation.
+
+Application works strip by strip on uint8 data with OpenCV primitives only.
+The grid points sit on exact 8-bit levels, so the cell and sub-cell weight of
+every channel value come from 256-entry tables. The cube's red slices are
+pre-interpolated along red to all 256 levels and laid side by side as one 2D
+image, so what remains of each lookup is bilinear over (green, blue): a single
+fixed-point cv2.remap. Colours whose grid cell lies entirely outside the
+skin region come back unchanged, because trilinear interpolation of the
+identity is the identity.
+
+Interpolation blends the hard skin mask across one grid cell. Colours just
+outside the mask are pulled slightly toward the adjusted tone, which feathers
+the edge of the retouch.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.models.color_model import SkinTone
+from app.services.skin_mask import SkinTable, get_skin_table
+from app.services.skin_stats import strip_rows
+
+# Grid points per axis; 255 / 51 = 5, so every grid point is an 8-bit level
+LUT_SIZE = 52
+
+# Pixel budget for measuring the skin's mean HSV
+HSV_MEAN_MAX_PIXELS = 1 << 20
+
+# Sub-pixel positions per axis in OpenCV's fixed-point remap (INTER_TAB_SIZE)
+_REMAP_TAB_SIZE = 32
+
+# Target skin tones (average values in OpenCV HSV)
+TARGET_HSV: Dict[SkinTone, Tuple[int, int, int]] = {
+    SkinTone.VERY_LIGHT: (0, 30, 240),
+    SkinTone.LIGHT: (0, 40, 230),
+    SkinTone.MEDIUM_LIGHT: (0, 50, 220),
+    SkinTone.MEDIUM: (0, 60, 200),
+    SkinTone.MEDIUM_DARK: (0, 70, 180),
+    SkinTone.DARK: (0, 80, 160),
+    SkinTone.VERY_DARK: (0, 90, 140),
+}
+
+
+class ColorLUT:
+    """A size^3 RGB -> RGB lookup table with trilinear application."""
+
+    def __init__(self, table: np.ndarray):
+        """
+        Args:
+            table: (size, size, size, 3) output colours in 0-255, indexed
+                [r, g, b] by grid position; size - 1 must divide 255 so every
+                grid point is an exact 8-bit colour
+
+        Raises:
+            ValueError: If the grid points do not fall on 8-bit levels
+        """
+        self.size = table.shape[0]
+        if 255 % (self.size - 1):
+            raise ValueError(f"LUT size {self.size} does not put grid points on 8-bit levels")
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+
+        # Red is resolved ahead of time: the table is interpolated along red
+        # to all 256 levels, and those slices are laid side by side as one
+        # 2D uint8 image whose rows are green and whose column
+        # red * size + b holds the colour for (red, g, b). Applying the LUT
+        # is then a single bilinear lookup over (g, b).
+        step = 255 // (self.size - 1)
+        levels = np.arange(256)
+        # The float interpolation along red needs a cell with an upper
+        # neighbour, so level 255 uses the last cell at fraction 1
+        red_cell = np.minimum(levels // step, self.size - 2)
+        red_fraction = ((levels - red_cell * step) / step).astype(np.float32)[:, np.newaxis, np.newaxis, np.newaxis]
+        by_red = self.table[red_cell] * (1 - red_fraction) + self.table[red_cell + 1] * red_fraction
+        self._slices = np.ascontiguousarray(
+            np.rint(by_red).clip(0, 255).astype(np.uint8).transpose(1, 0, 2, 3).reshape(self.size, -1, 3)
+        )
+
+        # Per-level lookup tables giving each 8-bit value's column/row and the
+        # 5-bit sub-cell weight index that cv2.remap's fixed-point maps use.
+        # The cell is not clamped here: a weight of _REMAP_TAB_SIZE does not
+        # fit in 5 bits, so level 255 must be the last grid point itself at
+        # weight 0 (its neighbour, past the edge, gets no weight and is
+        # covered by BORDER_REPLICATE), not the last cell at weight 32
+        cell = levels // step
+        sub_cell = np.rint((levels - cell * step) / step * _REMAP_TAB_SIZE).astype(np.int64)
+        self._cell = cell.astype(np.int16)
+        self._red_base = (levels * self.size).astype(np.int16)
+        self._x_weight = sub_cell.astype(np.uint16)
+        self._y_weight = (sub_cell * _REMAP_TAB_SIZE).astype(np.uint16)
+
+    def apply(self, image_rgb: np.ndarray) -> np.ndarray:
+        """
+        Map every pixel of an image through the table.
+
+        Args:
+            image_rgb: HxWx3 uint8 array in RGB channel order
+
+        Returns:
+            New HxWx3 uint8 array
+        """
+        return apply_luts(image_rgb, [self])[0]
+
+    def remap_maps(self, strip: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Build the fixed-point cv2.remap maps that look a strip up in the table.
+
+        The maps depend only on the pixels and the grid size, so every LUT of
+        the same size can share them.
+
+        Returns:
+            Tuple of the integer (x, y) map and the packed sub-pixel weight map
+        """
+        red, green, blue = cv2.split(strip)
+        map_x = cv2.add(cv2.LUT(red, self._red_base), cv2.LUT(blue, self._cell))
+        map_y = cv2.LUT(green, self._cell)
+        weights = cv2.add(cv2.LUT(blue, self._x_weight), cv2.LUT(green, self._y_weight))
+        return cv2.merge([map_x, map_y]), weights
+
+    def lookup(self, maps: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+        """Trilinear lookup of a strip, given its remap_maps(), as one fixed-point cv2.remap."""
+        return cv2.remap(self._slices, maps[0], maps[1], cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+    def to_cube(self, title: str = "skin tone") -> str:
+        """
+        Serialize the table in the Adobe/Resolve .cube format.
+
+        Returns:
+            The file contents; red varies fastest, as the format requires
+        """
+        lines = [
+            f'TITLE "{title}"',
+            f"LUT_3D_SIZE {self.size}",
+            "DOMAIN_MIN 0.0 0.0 0.0",
+            "DOMAIN_MAX 1.0 1.0 1.0",
+        ]
+        # [r, g, b] indexing -> iterate b slowest, r fastest
+        values = (self.table.transpose(2, 1, 0, 3).reshape(-1, 3) / 255.0).clip(0, 1)
+        lines.extend(f"{r:.6f} {g:.6f} {b:.6f}" for r, g, b in values)
+        return "\n".join(lines) + "\n"
+
+    def save_cube(self, path: str, title: str = "skin tone") -> None:
+        """Write the table to a .cube file."""
+        with open(path, "w", encoding="ascii") as f:
+            f.write(self.to_cube(title))
+
+
+def apply_luts(image_rgb: np.ndarray, luts: Sequence[ColorLUT]) -> List[np.ndarray]:
+    """
+    Map an image through several LUTs of the same size in one pass.
+
+    Each strip is read and its remap maps are built once; only the final
+    remap is repeated per LUT.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        luts: LUTs sharing one grid size
+
+    Returns:
+        One new HxWx3 uint8 array per LUT, in order
+    """
+    if len({lut.size for lut in luts}) > 1:
+        raise ValueError("LUTs applied together must share a grid size")
+    height, width = image_rgb.shape[:2]
+    outputs = [np.empty_like(image_rgb) for _ in luts]
+    rows = strip_rows(width)
+    for top in range(0, height, rows):
+        maps = luts[0].remap_maps(image_rgb[top:top + rows])
+        for lut, output in zip(luts, outputs):
+            output[top:top + rows] = lut.lookup(maps)
+    return outputs
+
+
+def identity_grid(size: int = LUT_SIZE) -> np.ndarray:
+    """(size, size, size, 3) float32 grid of the RGB colours at each grid point."""
+    levels = np.linspace(0, 255, size, dtype=np.float32)
+    red, green, blue = np.meshgrid(levels, levels, levels, indexing="ij")
+    return np.stack([red, green, blue], axis=-1)
+
+
+def skin_hsv_mean(
+    image_rgb: np.ndarray, table: Optional[SkinTable] = None, max_pixels: int = HSV_MEAN_MAX_PIXELS
+) -> Optional[np.ndarray]:
+    """
+    Mean OpenCV HSV of an image's skin pixels, converting only skin pixels.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+        max_pixels: Larger images are read on a regular pixel grid (a strided
+            view, no copy) of about this many pixels; a mean over hundreds of
+            thousands of pixels does not need millions more
+
+    Returns:
+        (h, s, v) means, or None if the image has no skin pixels
+    """
+    table = table or get_skin_table()
+    height, width = image_rgb.shape[:2]
+    stride = max(1, int((height * width / max_pixels) ** 0.5))
+    image_rgb = image_rgb[::stride, ::stride]
+    rows = strip_rows(image_rgb.shape[1])
+    sums = np.zeros(3, dtype=np.int64)
+    count = 0
+    for top in range(0, image_rgb.shape[0], rows):
+        strip = image_rgb[top:top + rows]
+        skin_pixels = strip[table.lookup(strip) > 0]
+        if len(skin_pixels):
+            skin_hsv = cv2.cvtColor(skin_pixels[np.newaxis], cv2.COLOR_RGB2HSV)[0]
+            sums += skin_hsv.sum(axis=0, dtype=np.int64)
+            count += len(skin_pixels)
+    return sums / count if count else None
+
+
+def tone_factors(mean_hsv: Sequence[float], target_tone: SkinTone) -> np.ndarray:
+    """Per-channel HSV scale factors that move mean_hsv onto the target tone."""
+    return hsv_factors(mean_hsv, TARGET_HSV[target_tone])
+
+
+def hsv_factors(mean_hsv: Sequence[float], target_hsv: Sequence[float]) -> np.ndarray:
+    """Per-channel HSV scale factors that move mean_hsv onto target_hsv; channels with a zero mean keep 1."""
+    target = np.asarray(target_hsv, dtype=np.float64)
+    mean_hsv = np.asarray(mean_hsv, dtype=np.float64)
+    return np.where(mean_hsv > 0, target / np.where(mean_hsv > 0, mean_hsv, 1), 1.0)
+
+
+def build_tone_lut(factors: Sequence[float], table: Optional[SkinTable] = None, size: int = LUT_SIZE) -> ColorLUT:
+    """
+    Sample the skin tone transfer on a size^3 grid.
+
+    Skin colours (per the skin rule) have their OpenCV HSV channels scaled
+    by factors and clipped; all other colours map to themselves.
+
+    Args:
+        factors: (h, s, v) scale factors from tone_factors()
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+        size: Grid points per axis
+
+    Returns:
+        The ColorLUT
+    """
+    return build_tone_luts([factors], table, size)[0]
+
+
+def build_tone_luts(
+    factor_sets: Sequence[Sequence[float]], table: Optional[SkinTable] = None, size: int = LUT_SIZE
+) -> List[ColorLUT]:
+    """
+    Sample several tone transfers on one size^3 grid.
+
+    The grid's HSV conversion and skin mask are computed once and shared.
+
+    Args:
+        factor_sets: (h, s, v) scale factors from tone_factors(), one per LUT
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+        size: Grid points per axis
+
+    Returns:
+        One ColorLUT per factor set, in order
+    """
+    table = table or get_skin_table()
+    grid = identity_grid(size)
+    # The grid as a (size*size) x size image, so OpenCV and the skin rule can take it
+    grid_rgb = np.rint(grid).astype(np.uint8).reshape(size * size, size, 3)
+    identity = grid.reshape(size * size, size, 3)
+
+    hsv = cv2.cvtColor(grid_rgb, cv2.COLOR_RGB2HSV).astype(np.float64)
+    skin = (table.lookup(grid_rgb) > 0)[..., np.newaxis]
+
+    luts = []
+    for factors in factor_sets:
+        adjusted_hsv = np.clip(hsv * np.asarray(factors, dtype=np.float64), 0, 255).astype(np.uint8)
+        adjusted_rgb = cv2.cvtColor(adjusted_hsv, cv2.COLOR_HSV2RGB).astype(np.float32)
+        luts.append(ColorLUT(np.where(skin, adjusted_rgb, identity).reshape(size, size, size, 3)))
+    return luts
@@ -0,0 +1,105 @@
+"""
+Face detection for restricting skin analysis to regions of interest.
+
+Uses the cascade classifiers bundled with OpenCV under ``cv2.data``, so no
+model download is needed. Detection runs on a small grayscale copy of the
+image and the boxes are scaled back, which keeps its cost independent of the
+analysis resolution.
+"""
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (x, y, width, height) in pixels of the image passed to detect_faces
+FaceBox = Tuple[int, int, int, int]
+
+# Longest side of the grayscale copy the cascade runs on
+DETECTION_MAX_SIDE = 640
+
+# Share of each box side kept around the box centre; trims the hair,
+# background and neck that frontal face boxes include at their edges
+FACE_BOX_SCALE = 0.8
+
+# Smallest face worth analyzing, as a share of the detection image's shorter side
+MIN_FACE_FRACTION = 0.05
+
+# CascadeClassifier objects are not safe to share between threads
+_local = threading.local()
+
+
+def cascade_path(name: Optional[str] = None) -> str:
+    """Full path of a cascade file shipped with OpenCV."""
+    return os.path.join(cv2.data.haarcascades, name or settings.face_cascade)
+
+
+def get_face_detector() -> Optional["cv2.CascadeClassifier"]:
+    """
+    Return this thread's cascade classifier, loading it on first use.
+
+    Returns:
+        The classifier, or None if this OpenCV build has no cascade support
+        (OpenCV 5 moved it out of the main package) or the configured cascade
+        file is not available
+    """
+    detector = getattr(_local, "detector", None)
+    if detector is None:
+        detector = False
+        if not hasattr(cv2, "CascadeClassifier"):
+            logger.warning("This OpenCV build has no CascadeClassifier; analyzing full frames")
+        else:
+            path = cascade_path()
+            classifier = cv2.CascadeClassifier(path)
+            if classifier.empty():
+                logger.warning(f"Face cascade not available at {path}; analyzing full frames")
+            else:
+                detector = classifier
+        _local.detector = detector
+    return detector or None
+
+
+def detect_faces(image_rgb: np.ndarray) -> List[FaceBox]:
+    """
+    Find frontal faces in an image.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+
+    Returns:
+        Face boxes shrunk to their skin-dominated centre, largest first; empty
+        if no face was found or no detector is available
+    """
+    detector = get_face_detector()
+    if detector is None:
+        return []
+
+    height, width = image_rgb.shape[:2]
+    scale = min(1.0, DETECTION_MAX_SIDE / max(height, width))
+    gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+    if scale < 1.0:
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+    gray = cv2.equalizeHist(gray)
+
+    min_face = max(20, int(min(gray.shape) * MIN_FACE_FRACTION))
+    detections = detector.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(min_face, min_face))
+
+    boxes = []
+    for x, y, w, h in detections:
+        # Back to image coordinates, keeping the centre of the box
+        inner_w, inner_h = w * FACE_BOX_SCALE / scale, h * FACE_BOX_SCALE / scale
+        left = int((x + w / 2) / scale - inner_w / 2)
+        top = int((y + h / 2) / scale - inner_h / 2)
+        left, top = max(0, left), max(0, top)
+        right = min(width, left + max(1, int(inner_w)))
+        bottom = min(height, top + max(1, int(inner_h)))
+        boxes.append((left, top, right - left, bottom - top))
+
+    return sorted(boxes, key=lambda box: box[2] * box[3], reverse=True)
@@ -0,0 +1,379 @@
+"""
+Output encoding with format negotiation.
+
+Adjusted images are encoded as JPEG, WebP or PNG, whichever the request asks
+for explicitly or prefers in its Accept header, rather than in the upload's
+own format. OpenCV's encoders are used when the build has them: cv2.imencode
+works straight from the array, with no intermediate PIL image. Pillow
+is the fallback.
+
+With a target SSIM, the JPEG/WebP quality is not fixed but searched: a
+small proxy of the image is encoded, decoded and compared to itself at a
+bisected quality until the lowest quality whose luma SSIM still meets the
+target is found, and the full image is encoded once at that quality.
+
+The proxy is a mosaic of full-resolution tiles taken on a regular grid, not
+a downscaled copy. Downscaling averages away the fine texture and noise
+that compression damages, so a downscaled proxy scores far higher than the
+full image would at the same quality. Tiles cut on 16-pixel boundaries are
+whole JPEG MCUs, which compress the same in the mosaic as in the image.
+"""
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError, ErrorCode
+
+logger = logging.getLogger(__name__)
+
+# Output format -> (file extension, media type, Pillow format name)
+OUTPUT_FORMATS: Dict[str, tuple] = {
+    "jpeg": ("jpg", "image/jpeg", "JPEG"),
+    "webp": ("webp", "image/webp", "WEBP"),
+    "png": ("png", "image/png", "PNG"),
+}
+
+# Qualities searched for a target SSIM; below 20 artifacts are obvious at
+# any score, above 95 files grow quickly for no visible gain
+QUALITY_SEARCH_RANGE = (20, 95)
+
+# Side of the full-resolution tiles the search proxy is built from; a
+# multiple of the 16-pixel JPEG MCU
+PROXY_TILE = 64
+
+# SSIM constants for 8-bit data (Wang et al. 2004)
+_SSIM_C1 = (0.01 * 255) ** 2
+_SSIM_C2 = (0.03 * 255) ** 2
+
+# Accepted spellings of each format in request parameters
+_FORMAT_ALIASES = {"jpg": "jpeg", "image/jpeg": "jpeg", "image/webp": "webp", "image/png": "png"}
+
+
+@dataclass
+class EncodedImage:
+    """An encoded image and how it was produced."""
+
+    data: bytes
+    format: str
+    quality: Optional[int]
+    progressive: bool
+    encoder: str
+    seconds: float
+    target_ssim: Optional[float] = None
+    ssim: Optional[float] = None
+
+    @property
+    def ext(self) -> str:
+        return OUTPUT_FORMATS[self.format][0]
+
+    @property
+    def media_type(self) -> str:
+        return OUTPUT_FORMATS[self.format][1]
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.data)
+
+    def info(self) -> Dict[str, Any]:
+        """Encoding summary for API responses."""
+        return {
+            "format": self.format,
+            "media_type": self.media_type,
+            "quality": self.quality,
+            "progressive": self.progressive,
+            "encoder": self.encoder,
+            "bytes": self.nbytes,
+            "encode_ms": round(self.seconds * 1000, 2),
+            "target_ssim": self.target_ssim,
+            "ssim": self.ssim,
+        }
+
+
+def parse_format(value: str) -> str:
+    """
+    Normalize an output format name ("jpeg", "jpg", "webp", "png" or a media type).
+
+    Raises:
+        ApplicationError: If the format is not supported
+    """
+    name = value.strip().lower()
+    name = _FORMAT_ALIASES.get(name, name)
+    if name not in OUTPUT_FORMATS:
+        raise ApplicationError(
+            f"Unsupported output format '{value}'",
+            ErrorCode.VALIDATION_ERROR,
+            {"allowed": list(OUTPUT_FORMATS)}
+        )
+    return name
+
+
+def negotiate_format(accept: Optional[str], requested: Optional[str] = None, default: Optional[str] = None) -> str:
+    """
+    Choose the output format for a request.
+
+    An explicitly requested format wins. Otherwise the Accept header's
+    highest q-value decides; at equal q a format the header names beats one
+    matched through image/* or */*, and after that the default is preferred.
+
+    Args:
+        accept: The request's Accept header, if any
+        requested: Format asked for explicitly (form field or query parameter)
+        default: Format used when neither decides; settings.output_format
+            if not given
+
+    Returns:
+        Key of OUTPUT_FORMATS
+    """
+    default = parse_format(default or settings.output_format)
+    if requested:
+        return parse_format(requested)
+    if not accept:
+        return default
+
+    explicit: Dict[str, float] = {}
+    wildcard = 0.0
+    for entry in accept.split(","):
+        media_type, *params = [part.strip() for part in entry.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if media_type in ("*/*", "image/*"):
+            wildcard = max(wildcard, q)
+        elif media_type in _FORMAT_ALIASES:
+            explicit[_FORMAT_ALIASES[media_type]] = q
+
+    preference = [default] + [name for name in OUTPUT_FORMATS if name != default]
+    ranked = max(preference, key=lambda name: (explicit.get(name, wildcard), name in explicit))
+    return ranked if explicit.get(ranked, wildcard) > 0 else default
+
+
+@dataclass(frozen=True)
+class EncodeOptions:
+    """
+    How to encode an output image; unset fields take the output_* settings.
+
+    With target_ssim set, the quality is searched for (see search_quality)
+    and the quality field is ignored. Frozen, so it can be a pipeline
+    parameter and part of cache keys.
+    """
+
+    format: Optional[str] = None
+    quality: Optional[int] = None
+    progressive: Optional[bool] = None
+    target_ssim: Optional[float] = None
+
+    def resolve(self) -> "EncodeOptions":
+        """Fill in defaults from settings, normalize the format, clamp the quality and round target_ssim to 4 places."""
+        output_format = parse_format(self.format or settings.output_format)
+        if output_format == "png":
+            # Lossless; quality and progressive do not apply
+            return EncodeOptions(output_format, None, False)
+        quality = max(1, min(100, self.quality if self.quality is not None else settings.output_quality))
+        progressive = output_format == "jpeg" and (
+            settings.output_progressive if self.progressive is None else self.progressive
+        )
+        target_ssim = None if self.target_ssim is None else round(self.target_ssim, 4)
+        return EncodeOptions(output_format, quality, progressive, target_ssim)
+
+    def tag(self) -> str:
+        """
+        Encode the resolved options as a short URL- and filename-safe string.
+
+        For example "jpeg_q90", "jpeg_q85_p" or "webp_q90_s0.9500"; from_tag()
+        reverses it. Two option sets that encode differently never share a tag.
+        """
+        options = self.resolve()
+        parts = [options.format]
+        if options.quality is not None:
+            parts.append(f"q{options.quality}")
+        if options.progressive:
+            parts.append("p")
+        if options.target_ssim is not None:
+            parts.append(f"s{options.target_ssim:.4f}")
+        return "_".join(parts)
+
+    @staticmethod
+    def from_tag(tag: str) -> "EncodeOptions":
+        """
+        Parse a tag() back into resolved options.
+
+        Raises:
+            ApplicationError: If the tag is malformed
+        """
+        output_format, *parts = tag.split("_")
+        quality, progressive, target_ssim = None, False, None
+        try:
+            for part in parts:
+                if part.startswith("q") and quality is None:
+                    quality = int(part[1:])
+                elif part == "p" and not progressive:
+                    progressive = True
+                elif part.startswith("s") and target_ssim is None:
+                    target_ssim = float(part[1:])
+                else:
+                    raise ValueError(part)
+        except ValueError:
+            raise ApplicationError(f"Invalid encoding tag '{tag}'", ErrorCode.VALIDATION_ERROR)
+        options = EncodeOptions(output_format, quality, progressive, target_ssim).resolve()
+        if options.tag() != tag or (target_ssim is not None and not 0 < target_ssim < 1):
+            # Out of range or not in canonical form
+            raise ApplicationError(f"Invalid encoding tag '{tag}'", ErrorCode.VALIDATION_ERROR)
+        return options
+
+    @property
+    def ext(self) -> str:
+        """File extension of the resolved format."""
+        return OUTPUT_FORMATS[parse_format(self.format or settings.output_format)][0]
+
+
+def ssim(reference: np.ndarray, image: np.ndarray) -> float:
+    """
+    Mean structural similarity of two single-channel 8-bit images.
+
+    Uses the usual 11x11 Gaussian window with sigma 1.5.
+    """
+    reference = reference.astype(np.float32)
+    image = image.astype(np.float32)
+
+    def blur(values: np.ndarray) -> np.ndarray:
+        return cv2.GaussianBlur(values, (11, 11), 1.5)
+
+    mu_x, mu_y = blur(reference), blur(image)
+    mu_xx, mu_yy, mu_xy = mu_x * mu_x, mu_y * mu_y, mu_x * mu_y
+    sigma_xx = blur(reference * reference) - mu_xx
+    sigma_yy = blur(image * image) - mu_yy
+    sigma_xy = blur(reference * image) - mu_xy
+    ssim_map = ((2 * mu_xy + _SSIM_C1) * (2 * sigma_xy + _SSIM_C2)) / (
+        (mu_xx + mu_yy + _SSIM_C1) * (sigma_xx + sigma_yy + _SSIM_C2)
+    )
+    return float(ssim_map.mean())
+
+
+def search_proxy(image_rgb: np.ndarray, side: Optional[int] = None) -> np.ndarray:
+    """
+    A side x side (at most) mosaic of full-resolution tiles sampled on a regular grid.
+
+    Images that already fit in side x side pixels are returned as they are.
+    """
+    side = side or settings.quality_search_proxy_side
+    height, width = image_rgb.shape[:2]
+    if height * width <= side * side or min(height, width) < PROXY_TILE:
+        return image_rgb
+    count = max(1, side // PROXY_TILE)
+    rows = (np.linspace(0, height - PROXY_TILE, count) // 16 * 16).astype(int)
+    columns = (np.linspace(0, width - PROXY_TILE, count) // 16 * 16).astype(int)
+    return np.ascontiguousarray(np.vstack([
+        np.hstack([image_rgb[y:y + PROXY_TILE, x:x + PROXY_TILE] for x in columns]) for y in rows
+    ]))
+
+
+def search_quality(
+    image_rgb: np.ndarray, output_format: str, target_ssim: float, proxy_side: Optional[int] = None
+) -> Tuple[int, float]:
+    """
+    Find the lowest quality whose encoding keeps the luma SSIM at or above target.
+
+    Bisects QUALITY_SEARCH_RANGE on the image's search_proxy(), relying on
+    SSIM rising with quality. If even the top of the range misses the target,
+    the top is returned with its score.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        output_format: "jpeg" or "webp"
+        target_ssim: Minimum SSIM against the uncompressed proxy
+        proxy_side: Side of the proxy mosaic; defaults to
+            settings.quality_search_proxy_side
+
+    Returns:
+        Tuple of (quality, SSIM of the proxy at that quality)
+    """
+    proxy = search_proxy(image_rgb, proxy_side)
+    reference = cv2.cvtColor(proxy, cv2.COLOR_RGB2GRAY)
+    scores: Dict[int, float] = {}
+
+    def score(quality: int) -> float:
+        if quality not in scores:
+            data, _ = _encode(proxy, output_format, quality, False)
+            decoded = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            if decoded is None:
+                # This OpenCV build cannot read the format back; Pillow can
+                decoded = np.asarray(Image.open(io.BytesIO(data)).convert("L"))
+            scores[quality] = ssim(reference, decoded)
+        return scores[quality]
+
+    low, high = QUALITY_SEARCH_RANGE
+    if score(high) < target_ssim:
+        return high, scores[high]
+    while low < high:
+        middle = (low + high) // 2
+        if score(middle) >= target_ssim:
+            high = middle
+        else:
+            low = middle + 1
+    return high, score(high)
+
+
+def _encode(image_rgb: np.ndarray, output_format: str, quality: Optional[int], progressive: bool) -> Tuple[bytes, str]:
+    """Encode with OpenCV when it has the codec, Pillow otherwise; returns (data, encoder name)."""
+    ext, _, pil_format = OUTPUT_FORMATS[output_format]
+    if cv2.haveImageWriter(f".{ext}"):
+        params = []
+        if output_format == "jpeg":
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality, cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive)]
+        elif output_format == "webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        ok, buffer = cv2.imencode(f".{ext}", cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR), params)
+        if not ok:
+            raise ApplicationError(f"Failed to encode {output_format}", ErrorCode.IMAGE_PROCESSING_ERROR)
+        return buffer.tobytes(), "opencv"
+
+    pil_options: Dict[str, Any] = {}
+    if quality is not None:
+        pil_options["quality"] = quality
+    if progressive:
+        pil_options["progressive"] = True
+    output = io.BytesIO()
+    Image.fromarray(image_rgb).save(output, format=pil_format, **pil_options)
+    return output.getvalue(), "pillow"
+
+
+def encode_image(image_rgb: np.ndarray, options: Optional[EncodeOptions] = None) -> EncodedImage:
+    """
+    Encode an RGB array.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        options: Format, quality, progressive flag and optional target SSIM;
+            defaults to the output_* settings
+
+    Returns:
+        The EncodedImage, with its encode time (including any quality search)
+        and, for a target SSIM, the proxy score at the chosen quality
+
+    Raises:
+        ApplicationError: If encoding fails
+    """
+    options = (options or EncodeOptions()).resolve()
+    output_format, quality, progressive = options.format, options.quality, options.progressive
+
+    start = time.perf_counter()
+    score = None
+    if options.target_ssim is not None and output_format != "png":
+        quality, score = search_quality(image_rgb, output_format, options.target_ssim)
+    data, encoder = _encode(image_rgb, output_format, quality, progressive)
+    seconds = time.perf_counter() - start
+
+    logger.debug(f"Encoded {output_format} q={quality} with {encoder}: {len(data)} bytes in {seconds * 1000:.1f} ms")
+    return EncodedImage(data, output_format, quality, progressive, encoder, seconds, options.target_ssim, score)
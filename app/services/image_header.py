@@ -0,0 +1,163 @@
+"""
+Header-only image validation.
+
+Reads just the few bytes that declare an image's format and dimensions, so
+uploads can be rejected before any decoding work or disk write. This guards
+against decompression bombs: a tiny PNG that declares 30000x30000 pixels would
+otherwise make OpenCV allocate gigabytes.
+"""
+import mmap
+import struct
+from typing import Tuple, Union
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError, ErrorCode
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# Formats named as PIL does, keyed by the extensions that may carry them
+EXTENSION_FORMATS = {
+    "jpg": "JPEG",
+    "jpeg": "JPEG",
+    "png": "PNG",
+}
+
+# SOFn markers carry the frame size; C4 (DHT), C8 (JPG) and CC (DAC) do not
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field
+_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0x01}
+
+
+def _invalid(message: str, **details) -> ApplicationError:
+    return ApplicationError(message, ErrorCode.VALIDATION_ERROR, details)
+
+
+def _jpeg_size(data: Buffer) -> Tuple[int, int]:
+    """Walk JPEG marker segments up to the first SOF and return (width, height)."""
+    offset = 2
+    length = len(data)
+    while offset + 4 <= length:
+        if data[offset] != 0xFF:
+            raise _invalid("Corrupt JPEG header")
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker in _STANDALONE_MARKERS:
+            offset += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            break
+
+        segment_length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        if marker in _SOF_MARKERS:
+            if offset + 9 > length:
+                break
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+
+    raise _invalid("JPEG header has no frame size")
+
+
+def probe_header(data: Buffer) -> Tuple[str, int, int]:
+    """
+    Identify an image from its magic bytes and read its declared size.
+
+    Args:
+        data: The encoded image, or at least its leading bytes
+
+    Returns:
+        Tuple of (format name, width, height), with PIL-style format names
+
+    Raises:
+        ApplicationError: If the format is unsupported or the header is corrupt
+    """
+    if data[:len(PNG_MAGIC)] == PNG_MAGIC:
+        # The IHDR chunk always comes first: length, b"IHDR", width, height
+        if len(data) < 24 or data[12:16] != b"IHDR":
+            raise _invalid("Corrupt PNG header")
+        width, height = struct.unpack(">II", data[16:24])
+        return "PNG", width, height
+
+    if data[:len(JPEG_MAGIC)] == JPEG_MAGIC:
+        width, height = _jpeg_size(data)
+        return "JPEG", width, height
+
+    raise _invalid("Unsupported or unrecognized image format")
+
+
+def probe_file(image_path: str) -> Tuple[str, int, int]:
+    """
+    Probe an image file's header without reading the whole file.
+
+    The file is memory-mapped, so only the pages holding the header are read.
+    """
+    try:
+        with open(image_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return probe_header(data)
+    except ApplicationError:
+        raise
+    except (OSError, ValueError) as e:
+        # ValueError: mmap of an empty file
+        raise ApplicationError(
+            "Failed to load image",
+            ErrorCode.IMAGE_PROCESSING_ERROR,
+            {"original_error": str(e)}
+        )
+
+
+def check_dimensions(width: int, height: int):
+    """
+    Reject images whose declared size exceeds the configured limits.
+
+    Raises:
+        ApplicationError: If a side or the total pixel count is out of bounds
+    """
+    if width <= 0 or height <= 0:
+        raise _invalid("Image has no pixels", width=width, height=height)
+    if width > settings.max_image_width or height > settings.max_image_height:
+        raise _invalid(
+            f"Image dimensions {width}x{height} exceed the maximum of "
+            f"{settings.max_image_width}x{settings.max_image_height}",
+            width=width, height=height
+        )
+    if width * height > settings.max_image_pixels:
+        raise _invalid(
+            f"Image has {width * height} pixels, more than the maximum of {settings.max_image_pixels}",
+            width=width, height=height
+        )
+
+
+def validate_image_header(data: Buffer, ext: str) -> Tuple[str, int, int]:
+    """
+    Validate an upload from its header alone.
+
+    Checks that the magic bytes match the file extension and that the declared
+    dimensions are within limits. Takes microseconds regardless of file size.
+
+    Args:
+        data: The encoded image bytes
+        ext: Lower-cased file extension, already checked against
+            settings.allowed_extensions
+
+    Returns:
+        Tuple of (format name, width, height)
+
+    Raises:
+        ApplicationError: If the header is invalid or out of bounds
+    """
+    image_format, width, height = probe_header(data)
+    expected = EXTENSION_FORMATS.get(ext)
+    if expected != image_format:
+        raise _invalid(
+            f"File content is {image_format}, which does not match the .{ext} extension",
+            image_format=image_format, extension=ext
+        )
+    check_dimensions(width, height)
+    return image_format, width, height
@@ -0,0 +1,169 @@
+"""Image decoding helpers shared by the image processing pipeline."""
+import cv2
+import numpy as np
+import logging
+from typing import Tuple, Union
+
+from app.core.error_handling import ApplicationError, ErrorCode
+from app.services.image_header import check_dimensions, probe_file, probe_header
+
+logger = logging.getLogger(__name__)
+
+# A file path, or the encoded image bytes of an upload held in memory
+ImageSource = Union[str, bytes, bytearray, memoryview]
+
+# OpenCV decode flags that let libjpeg scale in the DCT domain
+REDUCED_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def read_image_header(source: ImageSource) -> Tuple[str, int, int]:
+    """
+    Read the format and dimensions of an image without decoding pixel data.
+
+    The declared dimensions are checked against the configured limits here,
+    so an oversized image is rejected before the decoder allocates anything.
+
+    Args:
+        source: Path to the image file or its encoded bytes
+
+    Returns:
+        Tuple of (format name, width, height)
+
+    Raises:
+        ApplicationError: If the source is not a supported image or is too large
+    """
+    if isinstance(source, str):
+        image_format, width, height = probe_file(source)
+    else:
+        image_format, width, height = probe_header(source)
+    check_dimensions(width, height)
+    return image_format, width, height
+
+
+def choose_reduction(image_format: str, width: int, height: int, max_side: int) -> int:
+    """
+    Pick the largest decoder downscale that still covers the target resolution.
+
+    Only JPEG benefits: libjpeg can skip DCT coefficients and never materialize
+    the full-size bitmap. Other formats are decoded at full size, since OpenCV
+    would decode them fully and resize anyway.
+
+    Args:
+        image_format: Format name from read_image_header()
+        width: Source width in pixels
+        height: Source height in pixels
+        max_side: Target longest side; 0 means full resolution
+
+    Returns:
+        Reduction factor (1, 2, 4 or 8)
+    """
+    if max_side <= 0 or image_format != "JPEG":
+        return 1
+
+    longest = max(width, height)
+    for factor in (8, 4, 2):
+        # Never go below the target; the final resize does the rest
+        if longest // factor >= max_side:
+            return factor
+    return 1
+
+
+def load_rgb(source: ImageSource, reduction: int = 1) -> np.ndarray:
+    """
+    Decode an image into an RGB array.
+
+    This is the only place an upload is decoded; every analysis stage
+    works on the returned array instead of re-reading the file. In-memory
+    uploads are decoded straight from their buffer without a copy or a
+    round-trip through the filesystem.
+
+    Args:
+        source: Path to the image file or its encoded bytes
+        reduction: Decoder downscale factor from choose_reduction()
+
+    Returns:
+        HxWx3 uint8 array in RGB channel order
+
+    Raises:
+        ApplicationError: If the image cannot be decoded
+    """
+    flags = REDUCED_DECODE_FLAGS[reduction]
+    if isinstance(source, str):
+        image = cv2.imread(source, flags)
+    else:
+        image = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flags)
+    if image is None:
+        raise ApplicationError(
+            "Failed to load image",
+            ErrorCode.IMAGE_PROCESSING_ERROR
+        )
+
+    # OpenCV decodes to BGR
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def resize_to_max_side(image_rgb: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Downscale an image so its longest side is at most max_side pixels.
+
+    Args:
+        image_rgb: HxWx3 image array
+        max_side: Longest allowed side; 0 or a larger value leaves the image as is
+
+    Returns:
+        The resized image, or the input array when no resize is needed
+    """
+    height, width = image_rgb.shape[:2]
+    longest = max(height, width)
+    if max_side <= 0 or longest <= max_side:
+        return image_rgb
+
+    scale = max_side / longest
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # INTER_AREA averages source pixels, which keeps colour statistics stable
+    return cv2.resize(image_rgb, size, interpolation=cv2.INTER_AREA)
+
+
+def load_thumbnail(source: ImageSource, size: int) -> np.ndarray:
+    """
+    Decode an image straight to a fixed size x size thumbnail.
+
+    The aspect ratio is not kept: batch statistics need equal shapes, and
+    stretching reweights rows against columns without changing colours.
+
+    Args:
+        source: Path to the image file or its encoded bytes
+        size: Side of the square thumbnail in pixels
+
+    Returns:
+        size x size x 3 uint8 array in RGB channel order
+
+    Raises:
+        ApplicationError: If the image is unsupported, too large or undecodable
+    """
+    image_format, width, height = read_image_header(source)
+    # Reduce against the shorter side so neither axis is upsampled by the decoder
+    reduction = choose_reduction(image_format, width, height, size * max(width, height) // max(1, min(width, height)))
+    image_rgb = load_rgb(source, reduction)
+    return cv2.resize(image_rgb, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def load_rgb_bounded(source: ImageSource, max_side: int) -> np.ndarray:
+    """
+    Decode an image no larger than needed for a max_side analysis.
+
+    Args:
+        source: Path to the image file or its encoded bytes
+        max_side: Target longest side; 0 decodes at full resolution
+
+    Returns:
+        HxWx3 uint8 RGB array whose longest side is at most max_side
+    """
+    image_format, width, height = read_image_header(source)
+    reduction = choose_reduction(image_format, width, height, max_side)
+    return resize_to_max_side(load_rgb(source, reduction), max_side)
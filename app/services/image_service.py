@@ -1,31 +1,89 @@
 """Image processing service for skin tone analysis and modification."""
+import json
 import os
 import uuid
-import cv2
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from PIL import Image
-from typing import Tuple, Dict, Any, Optional, List
+from typing import Tuple, Dict, Any, Optional, List, Sequence, Union
 import logging
-from skimage import color
-from colorthief import ColorThief
 
 from app.core.config import settings
 from app.core.error_handling import ApplicationError, ErrorCode
-from app.models.color_model import SkinTone, ColorPalette
+from app.core.timing import stage
+from app.models.color_model import SkinTone, ColorPalette, classify_lightness, classify_lightness_batch
+from app.services.image_loader import ImageSource, load_thumbnail
+from app.services.image_header import validate_image_header
+from app.services.palette import extract_palette
+from app.services.skin_stats import batch_statistics, stack_regions
+from app.services.face_regions import detect_faces
+from app.services.skin_sampling import estimate_skin_lightness
+from app.services.color_space import srgb_to_lightness
+from app.services.color_lut import ColorLUT, apply_luts, build_tone_luts, tone_factors
+from app.services.analysis_cache import analysis_cache, content_hash as compute_content_hash
+from app.services.image_encoder import EncodedImage, EncodeOptions, encode_image
+from app.services.pipeline import Pipeline
+from app.services.tone_session import ToneSession
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever detect_skin_tone's output changes so cached results are not reused
+ANALYSIS_VERSION = "4"
+
 class ImageService:
     """Service for processing images and detecting skin tones."""
     
     @staticmethod
-    def save_upload(file_data: bytes, filename: str) -> str:
+    def validate_extension(filename: str) -> str:
+        """
+        Check an upload's extension against settings.allowed_extensions.
+        
+        Args:
+            filename: Original filename
+            
+        Returns:
+            The lower-cased extension
+            
+        Raises:
+            ApplicationError: If the file type is not allowed
+        """
+        ext = filename.split('.')[-1].lower()
+        if ext not in settings.allowed_extensions:
+            raise ApplicationError(
+                f"File type .{ext} not allowed. Allowed types: {', '.join(settings.allowed_extensions)}",
+                ErrorCode.VALIDATION_ERROR
+            )
+        return ext
+    
+    @staticmethod
+    def validate_upload(file_data: Union[bytes, memoryview], filename: str) -> str:
+        """
+        Validate an upload from its extension and header, without decoding it.
+        
+        Args:
+            file_data: The binary file data
+            filename: Original filename
+            
+        Returns:
+            The lower-cased extension
+            
+        Raises:
+            ApplicationError: If the type is not allowed, the content does not
+                match the extension, or the declared dimensions are too large
+        """
+        ext = ImageService.validate_extension(filename)
+        validate_image_header(file_data, ext)
+        return ext
+    
+    @staticmethod
+    def save_upload(file_data: Union[bytes, memoryview], filename: str, content_hash: Optional[str] = None) -> str:
         """
         Save an uploaded file to disk.
         
         Args:
             file_data: The binary file data
             filename: Original filename
+            content_hash: SHA-256 of file_data if already known; the file is
+                then stored under its hash so identical uploads share one copy
             
         Returns:
             Path to the saved file
@@ -35,16 +93,15 @@ class ImageService:
         """
         try:
             # Generate a unique filename to prevent collisions
-            ext = filename.split('.')[-1].lower()
-            if ext not in settings.allowed_extensions:
-                raise ApplicationError(
-                    f"File type .{ext} not allowed. Allowed types: {', '.join(settings.allowed_extensions)}",
-                    ErrorCode.VALIDATION_ERROR
-                )
-            
-            unique_filename = f"{uuid.uuid4()}.{ext}"
+            ext = ImageService.validate_upload(file_data, filename)
+            
+            unique_filename = f"{content_hash or uuid.uuid4()}.{ext}"
             file_path = os.path.join(settings.upload_folder, unique_filename)
             
+            if content_hash and os.path.exists(file_path):
+                logger.info(f"Upload already stored at {file_path}")
+                return file_path
+            
             # Save the file
             with open(file_path, "wb") as f:
                 f.write(file_data)
@@ -63,12 +120,77 @@ class ImageService:
             )
     
     @staticmethod
-    def detect_skin_tone(image_path: str) -> Tuple[SkinTone, Dict[str, Any]]:
+    def detect_skin_tone(
+        image_path: str,
+        max_side: Optional[int] = None,
+        approximate: bool = False,
+        faces: Optional[bool] = None,
+        subjects: bool = False,
+    ) -> Tuple[SkinTone, Dict[str, Any]]:
         """
         Detect the skin tone from an image.
         
         Args:
             image_path: Path to the image file
+            max_side: Longest side in pixels to analyze at; defaults to
+                settings.analysis_max_side, 0 analyzes at full resolution
+            approximate: Estimate lightness from a stratified pixel sample
+                that stops once the skin tone bucket is settled
+            faces: Restrict skin statistics to detected faces, falling back
+                to the full frame if none is found (full analysis only); defaults to
+                settings.face_detection
+            subjects: Also report a tone, lightness and box for every
+                detected face in metadata["subjects"]
+            
+        Returns:
+            Tuple of (SkinTone enum, metadata dictionary)
+            
+        Raises:
+            ApplicationError: If skin tone detection fails
+        """
+        # Read the bytes once: they are both hashed for the cache and decoded
+        try:
+            with open(image_path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise ApplicationError(
+                "Failed to load image",
+                ErrorCode.IMAGE_PROCESSING_ERROR,
+                {"original_error": str(e)}
+            )
+        return ImageService.detect_skin_tone_from_bytes(
+            data, max_side, approximate=approximate, faces=faces, subjects=subjects
+        )
+    
+    @staticmethod
+    def detect_skin_tone_from_bytes(
+        data: Union[bytes, memoryview],
+        max_side: Optional[int] = None,
+        content_hash: Optional[str] = None,
+        approximate: bool = False,
+        faces: Optional[bool] = None,
+        subjects: bool = False,
+    ) -> Tuple[SkinTone, Dict[str, Any]]:
+        """
+        Detect the skin tone from an upload held in memory.
+        
+        The image is decoded straight from the buffer, so analysis never
+        touches the filesystem. Results are cached by content hash, so a
+        re-uploaded photo skips decoding entirely.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            max_side: Longest side in pixels to analyze at; defaults to
+                settings.analysis_max_side, 0 analyzes at full resolution
+            content_hash: SHA-256 of data if already computed while
+                receiving the upload; hashed here otherwise
+            approximate: Estimate lightness from a stratified pixel sample
+                that stops once the skin tone bucket is settled
+            faces: Restrict skin statistics to detected faces, falling back
+                to the full frame if none is found (full analysis only); defaults to
+                settings.face_detection
+            subjects: Also report a tone, lightness and box for every
+                detected face in metadata["subjects"]
             
         Returns:
             Tuple of (SkinTone enum, metadata dictionary)
@@ -76,65 +198,109 @@ class ImageService:
         Raises:
             ApplicationError: If skin tone detection fails
         """
+        # Skin and palette statistics don't need every pixel of a large photo
+        if max_side is None:
+            max_side = settings.analysis_max_side
+        if faces is None:
+            faces = settings.face_detection
+        
+        digest = content_hash or compute_content_hash(data)
+        key = analysis_cache.make_key(
+            digest,
+            ANALYSIS_VERSION,
+            max_side=max_side,
+            skin_rule=settings.skin_rule,
+            approximate=approximate,
+            faces=faces,
+            subjects=subjects,
+            # Settings the result depends on, so a disk tier written under
+            # another configuration is not served
+            face_cascade=settings.face_cascade,
+            sampling_confidence=settings.sampling_confidence,
+            sampling_initial_samples=settings.sampling_initial_samples,
+            sampling_max_samples=settings.sampling_max_samples,
+        )
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        result = ImageService._detect_skin_tone(data, max_side, approximate, faces, subjects, digest)
+        analysis_cache.put(key, result)
+        return result
+    
+    @staticmethod
+    def _detect_skin_tone(
+        source: ImageSource,
+        max_side: int,
+        approximate: bool = False,
+        faces: bool = False,
+        subjects: bool = False,
+        digest: Optional[str] = None,
+    ) -> Tuple[SkinTone, Dict[str, Any]]:
+        """Run skin tone detection on a file path or in-memory image; digest lets stages be shared."""
         try:
-            # Load the image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ApplicationError(
-                    "Failed to load image",
-                    ErrorCode.IMAGE_PROCESSING_ERROR
-                )
-            
-            # Convert to RGB (OpenCV uses BGR)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Use ColorThief to extract dominant colors
-            color_thief = ColorThief(image_path)
-            dominant_color = color_thief.get_color(quality=1)
-            palette = color_thief.get_palette(color_count=5, quality=1)
-            
-            # Convert to HSV for better skin tone analysis
-            image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
-            
-            # Define skin color range in HSV
-            lower_skin = np.array([0, 20, 70], dtype=np.uint8)
-            upper_skin = np.array([20, 255, 255], dtype=np.uint8)
-            
-            # Create a mask for skin color
-            skin_mask = cv2.inRange(image_hsv, lower_skin, upper_skin)
-            
-            # Apply the mask to the original image
-            skin_only = cv2.bitwise_and(image_rgb, image_rgb, mask=skin_mask)
-            
-            # Calculate average color of skin pixels
-            skin_pixels = skin_only[np.where(skin_mask > 0)]
-            if len(skin_pixels) > 0:
-                avg_skin_color = np.mean(skin_pixels, axis=0).astype(int)
+            # Decode once, letting the JPEG decoder downscale when it can;
+            # every stage below shares the pipeline's intermediates
+            pipeline = Pipeline(source, digest, max_side=max_side)
+            _, source_width, source_height = pipeline.get("header")
+            reduction = pipeline.get("reduction")
+            
+            if approximate:
+                image_rgb = pipeline.get("decode")
+                # Sample pixels until the tone bucket is settled; the
+                # palette comes from the same sample
+                with stage("sampling"):
+                    estimate = estimate_skin_lightness(image_rgb)
+                with stage("palette"):
+                    palette = extract_palette(estimate.pixels[np.newaxis], color_count=5)
+                skin_count, skin_fraction = estimate.skin_count, estimate.fraction
+                mean_rgb, lightness, lab = estimate.mean_rgb, estimate.lightness, None
+                with stage("faces"):
+                    boxes = detect_faces(image_rgb) if subjects else []
+                face_regions = None
+                sampling = {
+                    "sample_count": estimate.sample_count,
+                    "skin_sample_count": estimate.skin_count,
+                    "confidence": settings.sampling_confidence,
+                    "lightness_interval": list(estimate.interval) if estimate.interval else None,
+                    "converged": estimate.converged,
+                }
+            else:
+                image_rgb = pipeline.get("resize")
+                palette = pipeline.get("palette")
+                # Mask skin pixels and accumulate their statistics in one
+                # pass, only inside face boxes when there are any
+                boxes = list(pipeline.get("faces")) if faces or subjects else []
+                skin_stats = pipeline.get("face_stats" if faces and boxes else "skin_stats")
+                face_regions = {
+                    "boxes": [list(box) for box in boxes],
+                    "analyzed_pixels": skin_stats.pixel_count,
+                } if faces else None
+                skin_count, skin_fraction = skin_stats.skin_count, skin_stats.fraction
+                mean_rgb, sampling = skin_stats.mean, None
+                if skin_count > 0:
+                    # Classify on the median per-pixel L*, which shadows and
+                    # highlights inside the mask cannot drag around like a mean
+                    lightness = skin_stats.median_lightness
+                    lab = skin_stats.lab_summary()
+            
+            # The palette's first entry is the dominant color
+            dominant_color = palette[0]
+            
+            if skin_count > 0:
+                avg_skin_color = mean_rgb.astype(int)
             else:
                 # Fallback to dominant color if no skin detected
                 avg_skin_color = np.array(dominant_color)
-            
-            # Convert to Lab color space for better perceptual analysis
-            avg_skin_lab = color.rgb2lab([[avg_skin_color / 255.0]])[0][0]
-            
-            # L* component in Lab color space represents lightness
-            lightness = avg_skin_lab[0]
+                lightness = float(srgb_to_lightness(avg_skin_color.astype(np.uint8)))
+                lab = None
             
             # Determine skin tone category based on lightness
-            if lightness > 85:
-                skin_tone = SkinTone.VERY_LIGHT
-            elif lightness > 75:
-                skin_tone = SkinTone.LIGHT
-            elif lightness > 65:
-                skin_tone = SkinTone.MEDIUM_LIGHT
-            elif lightness > 55:
-                skin_tone = SkinTone.MEDIUM
-            elif lightness > 45:
-                skin_tone = SkinTone.MEDIUM_DARK
-            elif lightness > 35:
-                skin_tone = SkinTone.DARK
-            else:
-                skin_tone = SkinTone.VERY_DARK
+            skin_tone = classify_lightness(lightness)
+            
+            # One result per face, all computed in a single batched pass
+            with stage("subjects"):
+                subject_results = ImageService._analyze_subjects(image_rgb, boxes) if subjects else None
             
             # Prepare metadata
             metadata = {
@@ -154,6 +320,18 @@ class ImageService:
                     for color in palette
                 ],
                 "lightness": lightness,
+                "lab": lab,
+                "sampling": sampling,
+                "face_regions": face_regions,
+                "subjects": subject_results,
+                "skin_fraction": skin_fraction,
+                "analysis_resolution": {
+                    "width": image_rgb.shape[1],
+                    "height": image_rgb.shape[0],
+                    "source_width": source_width,
+                    "source_height": source_height,
+                    "decode_reduction": reduction,
+                },
             }
             
             return skin_tone, metadata
@@ -169,92 +347,342 @@ class ImageService:
             )
     
     @staticmethod
-    def adjust_skin_tone(image_path: str, target_tone: SkinTone) -> str:
+    def detect_skin_tones(
+        images: Sequence[ImageSource], size: Optional[int] = None
+    ) -> List[Tuple[Optional[SkinTone], Dict[str, Any]]]:
+        """
+        Detect the skin tones of many images in one vectorized pass.
+        
+        Every image is decoded to a size x size thumbnail and the thumbnails
+        are stacked, so masking, Lab conversion and bucketing each run once
+        for the whole batch. Results carry no palette and are not cached;
+        memory grows with len(images) * size^2.
+        
+        Args:
+            images: File paths or encoded image bytes
+            size: Thumbnail side in pixels; defaults to settings.batch_thumbnail_size
+            
+        Returns:
+            One (SkinTone, metadata) pair per image, in input order; images
+            that fail to decode get (None, {"error": ...})
+        """
+        size = size or settings.batch_thumbnail_size
+        results: List[Tuple[Optional[SkinTone], Dict[str, Any]]] = [(None, {}) for _ in images]
+        
+        thumbnails, decoded = [], []
+        for index, source in enumerate(images):
+            try:
+                thumbnails.append(load_thumbnail(source, size))
+                decoded.append(index)
+            except ApplicationError as e:
+                results[index] = (None, {"error": e.message})
+        if not thumbnails:
+            return results
+        
+        stack = np.stack(thumbnails)
+        stats = batch_statistics(stack)
+        lightness = stats.median_lightness.astype(np.float64)
+        
+        # Images without skin fall back to their overall mean lightness
+        no_skin = stats.skin_counts == 0
+        if no_skin.any():
+            lightness[no_skin] = srgb_to_lightness(stack[no_skin]).mean(axis=(1, 2))
+        
+        skin_tones = classify_lightness_batch(lightness)
+        for position, index in enumerate(decoded):
+            has_skin = not no_skin[position]
+            results[index] = (skin_tones[position], {
+                "lightness": float(lightness[position]),
+                "avg_skin_color": stats.mean_rgb[position].astype(int).tolist() if has_skin else None,
+                "skin_fraction": float(stats.fractions[position]),
+                "analysis_resolution": {"width": size, "height": size},
+            })
+        return results
+    
+    @staticmethod
+    def _analyze_subjects(image_rgb: np.ndarray, boxes: List[Tuple[int, int, int, int]]) -> List[Dict[str, Any]]:
+        """Classify every face box from one batched pass over their padded crops."""
+        if not boxes:
+            return []
+        stack, valid = stack_regions(image_rgb, boxes)
+        stats = batch_statistics(stack, valid)
+        
+        subject_results = []
+        for index, box in enumerate(boxes):
+            has_skin = stats.skin_counts[index] > 0
+            lightness = float(stats.median_lightness[index]) if has_skin else None
+            subject_results.append({
+                "box": list(box),
+                "skin_tone": classify_lightness(lightness).value if has_skin else None,
+                "lightness": lightness,
+                "avg_skin_color": stats.mean_rgb[index].astype(int).tolist() if has_skin else None,
+                "skin_fraction": float(stats.fractions[index]),
+            })
+        return subject_results
+    
+    @staticmethod
+    def adjust_skin_tone(
+        image_path: str, target_tone: SkinTone, max_side: int = 0, output: Optional[EncodeOptions] = None
+    ) -> Tuple[str, Dict[str, Any]]:
         """
         Adjust the skin tone in an image.
         
         Args:
             image_path: Path to the original image
             target_tone: Target skin tone to adjust to
+            max_side: Longest side of the output in pixels; 0 keeps full resolution
+            output: Output format, quality and progressive flag; defaults to
+                the output_* settings
             
         Returns:
-            Path to the adjusted image
+            Tuple of (path to the adjusted image, encoding summary with the
+            format, bytes and encode time)
             
         Raises:
             ApplicationError: If skin tone adjustment fails
         """
-        try:
-            # Load the image
-            image = cv2.imread(image_path)
-            if image is None:
-                raise ApplicationError(
-                    "Failed to load image",
-                    ErrorCode.IMAGE_PROCESSING_ERROR
-                )
-            
-            # Convert to RGB (OpenCV uses BGR)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            
-            # Convert to HSV for better skin tone analysis
-            image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
-            
-            # Define skin color range in HSV
-            lower_skin = np.array([0, 20, 70], dtype=np.uint8)
-            upper_skin = np.array([20, 255, 255], dtype=np.uint8)
-            
-            # Create a mask for skin color
-            skin_mask = cv2.inRange(image_hsv, lower_skin, upper_skin)
-            
-            # Target skin tones (average values in HSV)
-            target_hsv_values = {
-                SkinTone.VERY_LIGHT: [0, 30, 240],
-                SkinTone.LIGHT: [0, 40, 230],
-                SkinTone.MEDIUM_LIGHT: [0, 50, 220],
-                SkinTone.MEDIUM: [0, 60, 200],
-                SkinTone.MEDIUM_DARK: [0, 70, 180],
-                SkinTone.DARK: [0, 80, 160],
-                SkinTone.VERY_DARK: [0, 90, 140],
-            }
+        return ImageService._adjust_skin_tone(image_path, target_tone, max_side, output)
+    
+    @staticmethod
+    def adjust_skin_tone_from_bytes(
+        data: Union[bytes, memoryview],
+        filename: str,
+        target_tone: SkinTone,
+        max_side: int = 0,
+        output: Optional[EncodeOptions] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Adjust the skin tone of an upload held in memory.
+        
+        Only the retouched result is written to disk; the original upload
+        is never persisted.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
+            target_tone: Target skin tone to adjust to
+            max_side: Longest side of the output in pixels; 0 keeps full resolution
+            output: Output format, quality and progressive flag; defaults to
+                the output_* settings
             
-            # Get target HSV values
-            target_hsv = np.array(target_hsv_values[target_tone], dtype=np.uint8)
+        Returns:
+            Tuple of (path to the adjusted image, encoding summary with the
+            format, bytes and encode time)
             
-            # Create a copy of the original image
-            adjusted_image = image_rgb.copy()
+        Raises:
+            ApplicationError: If skin tone adjustment fails
+        """
+        ImageService.validate_upload(data, filename)
+        return ImageService._adjust_skin_tone(data, target_tone, max_side, output)
+    
+    @staticmethod
+    def tone_lut_from_bytes(
+        data: Union[bytes, memoryview], filename: str, target_tone: SkinTone, max_side: Optional[int] = None
+    ) -> ColorLUT:
+        """
+        Build the 3D colour LUT that adjust_skin_tone would apply to an image.
+        
+        The LUT can be exported with ColorLUT.save_cube() and applied to the
+        full-resolution original in any grading tool.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
+            target_tone: Target skin tone to adjust to
+            max_side: Resolution the skin statistics are measured at;
+                defaults to settings.analysis_max_side
             
-            # Apply skin mask to find skin pixels
-            skin_pixels = np.where(skin_mask > 0)
+        Returns:
+            The tone-transfer ColorLUT
             
-            # Get current skin HSV values
-            skin_hsv = image_hsv[skin_pixels]
+        Raises:
+            ApplicationError: If the image is invalid or contains no skin
+        """
+        ImageService.validate_upload(data, filename)
+        if max_side is None:
+            max_side = settings.analysis_max_side
+        lut = ImageService._pipeline(data, max_side=max_side, target_tone=target_tone).get("tone_lut")
+        if lut is None:
+            raise ApplicationError(
+                "No skin detected in image",
+                ErrorCode.IMAGE_PROCESSING_ERROR
+            )
+        return lut
+    
+    @staticmethod
+    def preview_skin_tone_from_bytes(
+        data: Union[bytes, memoryview],
+        filename: str,
+        target_tone: SkinTone,
+        content_hash: Optional[str] = None,
+        output: Optional[EncodeOptions] = None,
+    ) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Render a screen-sized skin tone adjustment and defer the full render.
+        
+        The preview's longest side is settings.preview_max_side. The upload
+        is stored under its content hash so the full-resolution render can be
+        produced later by render_full_resolution(), only if it is downloaded.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
+            target_tone: Target skin tone to adjust to
+            content_hash: SHA-256 of data if already known
+            output: Output format, quality, progressive flag and target SSIM;
+                the full render is encoded with the same options
+            
+        Returns:
+            Tuple of (preview path, download token, encoding summary). When
+            the preview was already rendered its stored summary is returned
+            with an encode time of zero
             
-            # Calculate adjustment factors
-            h_factor = target_hsv[0] / np.mean(skin_hsv[:, 0]) if np.mean(skin_hsv[:, 0]) > 0 else 1
-            s_factor = target_hsv[1] / np.mean(skin_hsv[:, 1]) if np.mean(skin_hsv[:, 1]) > 0 else 1
-            v_factor = target_hsv[2] / np.mean(skin_hsv[:, 2]) if np.mean(skin_hsv[:, 2]) > 0 else 1
+        Raises:
+            ApplicationError: If the upload is invalid or adjustment fails
+        """
+        output = (output or EncodeOptions()).resolve()
+        content_hash = content_hash or compute_content_hash(data)
+        ImageService.save_upload(data, filename, content_hash)
+        
+        # The token names every encoding option, so a stored preview or full
+        # render is only ever reused for a request that asked for the same
+        token = f"{content_hash}-{target_tone.name.lower()}-{output.tag()}"
+        preview_path = os.path.join(settings.upload_folder, f"preview_{token}.{output.ext}")
+        if os.path.exists(preview_path):
+            return preview_path, token, ImageService._stored_encoding(preview_path, output)
+        _, encoding = ImageService._adjust_skin_tone(data, target_tone, settings.preview_max_side, output, preview_path)
+        ImageService._write_atomic(f"{preview_path}.json", json.dumps(encoding).encode())
+        return preview_path, token, encoding
+    
+    @staticmethod
+    def _stored_encoding(path: str, output: EncodeOptions) -> Dict[str, Any]:
+        """
+        Encoding summary of an already rendered output, for a request that reuses it.
+        
+        Read from the summary stored next to the file; if that is missing or
+        unreadable, rebuilt from the file and its resolved options, without
+        the searched quality and SSIM. Nothing was encoded for this request,
+        so encode_ms is zero either way.
+        """
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                encoding = json.load(f)
+        except (OSError, ValueError):
+            encoding = EncodedImage(
+                b"", output.format, output.quality, output.progressive, "", 0.0, output.target_ssim
+            ).info()
+            encoding["encoder"] = None
+            if output.target_ssim is not None:
+                # The searched quality is not recoverable from the options
+                encoding["quality"] = None
+            encoding["bytes"] = os.path.getsize(path)
+        encoding["encode_ms"] = 0.0
+        return encoding
+    
+    @staticmethod
+    def load_preview_from_bytes(data: Union[bytes, memoryview], filename: str) -> np.ndarray:
+        """
+        Decode an upload at preview resolution for an interactive tone session.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
             
-            # Create adjusted HSV image
-            adjusted_hsv = image_hsv.copy()
+        Returns:
+            HxWx3 uint8 RGB array whose longest side is at most settings.preview_max_side
             
-            # Adjust only skin pixels
-            adjusted_hsv[skin_pixels] = np.clip([
-                skin_hsv[:, 0] * h_factor,
-                np.clip(skin_hsv[:, 1] * s_factor, 0, 255),
-                np.clip(skin_hsv[:, 2] * v_factor, 0, 255)
-            ], 0, 255).transpose()
+        Raises:
+            ApplicationError: If the upload is invalid or cannot be decoded
+        """
+        ImageService.validate_upload(data, filename)
+        try:
+            return ImageService._pipeline(data, max_side=settings.preview_max_side).get("resize")
+        except ApplicationError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to decode preview: {str(e)}")
+            raise ApplicationError(
+                "Failed to decode image",
+                ErrorCode.IMAGE_PROCESSING_ERROR,
+                {"original_error": str(e)}
+            )
+    
+    @staticmethod
+    def tone_session_from_bytes(data: Union[bytes, memoryview], filename: str) -> ToneSession:
+        """
+        Decode an upload at preview resolution and build its tone session working set.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
             
-            # Convert back to RGB
-            adjusted_rgb = cv2.cvtColor(adjusted_hsv, cv2.COLOR_HSV2RGB)
+        Returns:
+            The ToneSession, not yet registered with the session store
             
-            # Save the adjusted image
-            ext = image_path.split('.')[-1].lower()
-            adjusted_path = os.path.join(settings.upload_folder, f"adjusted_{uuid.uuid4()}.{ext}")
+        Raises:
+            ApplicationError: If the upload is invalid or cannot be decoded
+        """
+        return ToneSession(ImageService.load_preview_from_bytes(data, filename))
+    
+    @staticmethod
+    def render_full_resolution(token: str) -> str:
+        """
+        Produce the full-resolution render behind a preview token.
+        
+        The render is encoded with the preview's resolved options (format,
+        quality, progressive flag and target SSIM), which the token carries.
+        It is written once, on the first call; later calls return the stored
+        file.
+        
+        Args:
+            token: Token returned by preview_skin_tone_from_bytes()
             
-            # Convert to PIL Image and save
-            adjusted_pil = Image.fromarray(adjusted_rgb)
-            adjusted_pil.save(adjusted_path)
+        Returns:
+            Path to the full-resolution adjusted image
             
-            return adjusted_path
+        Raises:
+            ApplicationError: If the token is malformed or its upload is gone
+        """
+        parts = token.split("-")
+        target_tone = SkinTone.__members__.get(parts[1].upper()) if len(parts) == 3 else None
+        if (
+            target_tone is None
+            or len(parts[0]) != 64
+            or any(c not in "0123456789abcdef" for c in parts[0])
+        ):
+            raise ApplicationError(f"Invalid render token '{token}'", ErrorCode.VALIDATION_ERROR)
+        content_hash, output = parts[0], EncodeOptions.from_tag(parts[2])
+        
+        for ext in settings.allowed_extensions:
+            original_path = os.path.join(settings.upload_folder, f"{content_hash}.{ext}")
+            if os.path.exists(original_path):
+                break
+        else:
+            raise ApplicationError(f"No upload found for render token '{token}'", ErrorCode.NOT_FOUND)
+        
+        adjusted_path = os.path.join(settings.upload_folder, f"adjusted_{token}.{output.ext}")
+        if not os.path.exists(adjusted_path):
+            ImageService._adjust_skin_tone(original_path, target_tone, 0, output, adjusted_path)
+        return adjusted_path
+    
+    @staticmethod
+    def _adjust_skin_tone(
+        source: ImageSource,
+        target_tone: SkinTone,
+        max_side: int,
+        output: Optional[EncodeOptions] = None,
+        output_path: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Adjust the skin tone of a file path or in-memory image and save it (to output_path if given)."""
+        try:
+            # Decode no more pixels than the output needs; the tone transfer
+            # depends only on the mean HSV of the skin pixels, so it is
+            # sampled into a 3D LUT and applied in one pass
+            pipeline = ImageService._pipeline(
+                source, max_side=max_side, target_tone=target_tone, encode_options=output or EncodeOptions()
+            )
+            encoded = pipeline.get("encode")
+            return ImageService._save_adjusted(encoded, output_path), encoded.info()
             
         except ApplicationError:
             raise
@@ -266,6 +694,145 @@ class ImageService:
                 {"original_error": str(e)}
             )
     
+    @staticmethod
+    def adjust_skin_tone_variants(
+        image_path: str, max_side: int = 0, output: Optional[EncodeOptions] = None
+    ) -> Tuple[Dict[SkinTone, str], Dict[str, Any]]:
+        """
+        Render the image at every target skin tone.
+        
+        Args:
+            image_path: Path to the original image
+            max_side: Longest side of the outputs in pixels; 0 keeps full resolution
+            output: Output format, quality and progressive flag; defaults to
+                the output_* settings
+            
+        Returns:
+            Tuple of (dictionary mapping each SkinTone to the path of its
+            adjusted image, encoding summary with total bytes and encode time)
+            
+        Raises:
+            ApplicationError: If skin tone adjustment fails
+        """
+        return ImageService._adjust_skin_tone_variants(image_path, max_side, output)
+    
+    @staticmethod
+    def adjust_skin_tone_variants_from_bytes(
+        data: Union[bytes, memoryview], filename: str, max_side: int = 0, output: Optional[EncodeOptions] = None
+    ) -> Tuple[Dict[SkinTone, str], Dict[str, Any]]:
+        """
+        Render an upload held in memory at every target skin tone.
+        
+        Args:
+            data: Encoded image bytes (JPEG or PNG)
+            filename: Original filename, used to validate the format
+            max_side: Longest side of the outputs in pixels; 0 keeps full resolution
+            output: Output format, quality and progressive flag; defaults to
+                the output_* settings
+            
+        Returns:
+            Tuple of (dictionary mapping each SkinTone to the path of its
+            adjusted image, encoding summary with total bytes and encode time)
+            
+        Raises:
+            ApplicationError: If skin tone adjustment fails
+        """
+        ImageService.validate_upload(data, filename)
+        return ImageService._adjust_skin_tone_variants(data, max_side, output)
+    
+    @staticmethod
+    def _adjust_skin_tone_variants(
+        source: ImageSource, max_side: int, output: Optional[EncodeOptions] = None
+    ) -> Tuple[Dict[SkinTone, str], Dict[str, Any]]:
+        """
+        Render every SkinTone variant of an image and save them.
+        
+        The image is decoded and its skin measured once, the seven LUTs share
+        one grid conversion and one pass over the pixels, and the outputs are
+        encoded concurrently (the encoders release the GIL).
+        """
+        tones = list(SkinTone)
+        output = (output or EncodeOptions()).resolve()
+        try:
+            pipeline = ImageService._pipeline(source, max_side=max_side)
+            image_rgb, mean_hsv = pipeline.get("resize"), pipeline.get("skin_hsv_mean")
+            if mean_hsv is None:
+                # No skin to re-tone: every variant is the original
+                variants = [image_rgb] * len(tones)
+            else:
+                luts = build_tone_luts([tone_factors(mean_hsv, tone) for tone in tones])
+                variants = apply_luts(image_rgb, luts)
+            
+            workers = min(len(tones), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="variant-encoder") as encoders:
+                encoded = list(encoders.map(lambda adjusted_rgb: encode_image(adjusted_rgb, output), variants))
+            paths = [ImageService._save_adjusted(image) for image in encoded]
+            
+            encoding = encoded[0].info()
+            encoding["bytes"] = sum(image.nbytes for image in encoded)
+            encoding["encode_ms"] = round(sum(image.seconds for image in encoded) * 1000, 2)
+            if output.target_ssim is not None:
+                # Each variant gets its own searched quality
+                encoding["quality"] = {tone.value: image.quality for tone, image in zip(tones, encoded)}
+                encoding["ssim"] = {tone.value: image.ssim for tone, image in zip(tones, encoded)}
+            return dict(zip(tones, paths)), encoding
+            
+        except ApplicationError:
+            raise
+        except Exception as e:
+            logger.error(f"Failed to render skin tone variants: {str(e)}")
+            raise ApplicationError(
+                "Failed to adjust skin tone",
+                ErrorCode.IMAGE_PROCESSING_ERROR,
+                {"original_error": str(e)}
+            )
+    
+    @staticmethod
+    def _pipeline(source: ImageSource, **params: Any) -> Pipeline:
+        """
+        Start a stage pipeline for an image, keyed by its content hash.
+        
+        Stage outputs go through the process-wide array cache, so re-toning
+        the same upload again (another tone, a preview and then its full
+        render, a LUT export, an analysis at the same resolution) reuses the
+        decode and skin statistics.
+        """
+        if isinstance(source, str):
+            with open(source, "rb") as f:
+                digest = compute_content_hash(f.read())
+        else:
+            digest = compute_content_hash(source)
+        return Pipeline(source, digest, **params)
+    
+    @staticmethod
+    def _save_adjusted(encoded: EncodedImage, output_path: Optional[str] = None) -> str:
+        """
+        Write an encoded adjusted image and return its path.
+        
+        Without output_path the image gets a fresh name in the upload folder.
+        A named output is written to a temporary file and moved into place,
+        so concurrent renders of the same output never expose a partial file.
+        """
+        if output_path is None:
+            output_path = os.path.join(settings.upload_folder, f"adjusted_{uuid.uuid4()}.{encoded.ext}")
+            with open(output_path, "wb") as f:
+                f.write(encoded.data)
+            return output_path
+        ImageService._write_atomic(output_path, encoded.data)
+        return output_path
+    
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        """Write data to a temporary file and move it into place, so readers never see a partial file."""
+        partial_path = f"{path}.{uuid.uuid4().hex}.partial"
+        try:
+            with open(partial_path, "wb") as f:
+                f.write(data)
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+    
     @staticmethod
     def get_image_url(file_path: str) -> str:
         """
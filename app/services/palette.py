@@ -0,0 +1,259 @@
+"""
+Vectorized palette extraction.
+
+A NumPy port of the MMCQ (modified median cut quantization) algorithm used by
+ColorThief. The per-pixel work (quantizing to a 5-bit-per-channel histogram) is
+done with vectorized binning over the decoded array; only the median cut over
+the 32x32x32 histogram runs in Python, so the cost no longer scales with the
+number of pixels in Python bytecode.
+
+Tolerance: the box splitting, ordering and averaging follow ColorThief exactly,
+so for the same opaque RGB pixels the palette and dominant colour are identical
+to ``ColorThief.get_palette(color_count, quality=1)``. Differences only come from
+the input pixels themselves: a different JPEG decoder (OpenCV vs. PIL) can move
+individual pixels by a level or two, which shifts palette entries by at most a
+few units per channel, and alpha is not considered because decoded uploads are
+always opaque RGB.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SIGBITS = 5
+RSHIFT = 8 - SIGBITS
+HISTO_SIZE = 1 << SIGBITS
+MAX_ITERATION = 1000
+FRACT_BY_POPULATIONS = 0.75
+
+# Pixels are binned in slices of this many to bound temporary memory
+_CHUNK_PIXELS = 1 << 20
+
+_AXES = ("r", "g", "b")
+
+
+def color_histogram(image_rgb: np.ndarray) -> np.ndarray:
+    """
+    Build the MMCQ colour histogram of an image.
+
+    Near-white pixels (all channels above 250) are skipped, as in ColorThief.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+
+    Returns:
+        32x32x32 int64 array of pixel counts indexed by quantized (r, g, b)
+    """
+    pixels = image_rgb.reshape(-1, 3)
+    histo = np.zeros(HISTO_SIZE ** 3, dtype=np.int64)
+
+    for start in range(0, len(pixels), _CHUNK_PIXELS):
+        chunk = pixels[start:start + _CHUNK_PIXELS]
+        r, g, b = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        index = (
+            ((r >> RSHIFT).astype(np.uint16) << (2 * SIGBITS))
+            | ((g >> RSHIFT).astype(np.uint16) << SIGBITS)
+            | (b >> RSHIFT)
+        )
+        histo += np.bincount(index, minlength=histo.size)
+
+        white = (r > 250) & (g > 250) & (b > 250)
+        if white.any():
+            histo -= np.bincount(index[white], minlength=histo.size)
+
+    return histo.reshape(HISTO_SIZE, HISTO_SIZE, HISTO_SIZE)
+
+
+class _VBox:
+    """3d colour space box over the quantized histogram."""
+
+    def __init__(self, r1: int, r2: int, g1: int, g2: int, b1: int, b2: int, histo: np.ndarray):
+        self.r1, self.r2 = r1, r2
+        self.g1, self.g2 = g1, g2
+        self.b1, self.b2 = b1, b2
+        self.histo = histo
+        self._count: Optional[int] = None
+
+    @property
+    def copy(self) -> "_VBox":
+        return _VBox(self.r1, self.r2, self.g1, self.g2, self.b1, self.b2, self.histo)
+
+    @property
+    def view(self) -> np.ndarray:
+        return self.histo[self.r1:self.r2 + 1, self.g1:self.g2 + 1, self.b1:self.b2 + 1]
+
+    @property
+    def volume(self) -> int:
+        return (self.r2 - self.r1 + 1) * (self.g2 - self.g1 + 1) * (self.b2 - self.b1 + 1)
+
+    @property
+    def count(self) -> int:
+        if self._count is None:
+            self._count = int(self.view.sum())
+        return self._count
+
+    @property
+    def avg(self) -> Tuple[int, int, int]:
+        mult = 1 << RSHIFT
+        view = self.view
+        ntot = int(view.sum())
+        if not ntot:
+            return (
+                int(mult * (self.r1 + self.r2 + 1) / 2),
+                int(mult * (self.g1 + self.g2 + 1) / 2),
+                int(mult * (self.b1 + self.b2 + 1) / 2),
+            )
+
+        # sum(count * (i + 0.5) * mult) kept in exact integer arithmetic
+        averages = []
+        for axis, lower in enumerate((self.r1, self.g1, self.b1)):
+            other = tuple(a for a in range(3) if a != axis)
+            counts = view.sum(axis=other)
+            centers = (np.arange(lower, lower + len(counts), dtype=np.int64) * 2 + 1) * (mult // 2)
+            averages.append(int(int(counts @ centers) / ntot))
+        return averages[0], averages[1], averages[2]
+
+
+class _PQueue:
+    """Lazily sorted queue with ColorThief's exact ordering semantics."""
+
+    def __init__(self, sort_key: Callable[[_VBox], int]):
+        self.sort_key = sort_key
+        self.contents: List[_VBox] = []
+        self._sorted = False
+
+    def push(self, item: _VBox):
+        self.contents.append(item)
+        self._sorted = False
+
+    def pop(self) -> _VBox:
+        if not self._sorted:
+            self.contents.sort(key=self.sort_key)
+            self._sorted = True
+        return self.contents.pop()
+
+    def size(self) -> int:
+        return len(self.contents)
+
+
+def _median_cut_apply(vbox: _VBox) -> Tuple[Optional[_VBox], Optional[_VBox]]:
+    if not vbox.count:
+        return None, None
+    if vbox.count == 1:
+        return vbox.copy, None
+
+    widths = (vbox.r2 - vbox.r1 + 1, vbox.g2 - vbox.g1 + 1, vbox.b2 - vbox.b1 + 1)
+    axis = widths.index(max(widths))
+    dim = _AXES[axis]
+    dim1_val = getattr(vbox, dim + "1")
+    dim2_val = getattr(vbox, dim + "2")
+
+    other = tuple(a for a in range(3) if a != axis)
+    cumulative = np.cumsum(vbox.view.sum(axis=other))
+    total = int(cumulative[-1])
+    partialsum: Dict[int, int] = {dim1_val + i: int(v) for i, v in enumerate(cumulative)}
+    lookaheadsum = {i: total - d for i, d in partialsum.items()}
+
+    for i in range(dim1_val, dim2_val + 1):
+        if partialsum[i] > total / 2:
+            vbox1 = vbox.copy
+            vbox2 = vbox.copy
+            left = i - dim1_val
+            right = dim2_val - i
+            if left <= right:
+                d2 = min(dim2_val - 1, int(i + right / 2))
+            else:
+                d2 = max(dim1_val, int(i - 1 - left / 2))
+            # avoid 0-count boxes
+            while not partialsum.get(d2, False):
+                d2 += 1
+            count2 = lookaheadsum.get(d2)
+            while not count2 and partialsum.get(d2 - 1, False):
+                d2 -= 1
+                count2 = lookaheadsum.get(d2)
+            setattr(vbox1, dim + "2", d2)
+            setattr(vbox2, dim + "1", d2 + 1)
+            return vbox1, vbox2
+    return None, None
+
+
+def _iterate(queue: _PQueue, target: float):
+    n_color = 1
+    n_iter = 0
+    while n_iter < MAX_ITERATION:
+        vbox = queue.pop()
+        if not vbox.count:
+            queue.push(vbox)
+            n_iter += 1
+            continue
+        vbox1, vbox2 = _median_cut_apply(vbox)
+        if not vbox1:
+            raise ValueError("Median cut produced no box")
+        queue.push(vbox1)
+        if vbox2:
+            queue.push(vbox2)
+            n_color += 1
+        if n_color >= target:
+            return
+        n_iter += 1
+
+
+def quantize(histo: np.ndarray, max_color: int) -> List[Tuple[int, int, int]]:
+    """
+    Run modified median cut over a colour histogram.
+
+    Args:
+        histo: 32x32x32 histogram from color_histogram()
+        max_color: Maximum number of palette colours (2-256)
+
+    Returns:
+        Palette colours as (r, g, b) tuples, most significant first
+
+    Raises:
+        ValueError: If the histogram is empty or max_color is out of range
+    """
+    if max_color < 2 or max_color > 256:
+        raise ValueError("Wrong number of max colors when quantizing")
+
+    occupied = np.nonzero(histo)
+    if not len(occupied[0]):
+        raise ValueError("No non-white pixels to quantize")
+
+    vbox = _VBox(
+        int(occupied[0].min()), int(occupied[0].max()),
+        int(occupied[1].min()), int(occupied[1].max()),
+        int(occupied[2].min()), int(occupied[2].max()),
+        histo,
+    )
+
+    # First set of colours, split by population
+    pq = _PQueue(lambda box: box.count)
+    pq.push(vbox)
+    _iterate(pq, FRACT_BY_POPULATIONS * max_color)
+
+    # Re-sort by population times colour space volume and keep splitting
+    pq2 = _PQueue(lambda box: box.count * box.volume)
+    while pq.size():
+        pq2.push(pq.pop())
+    _iterate(pq2, max_color - pq2.size())
+
+    palette = []
+    while pq2.size():
+        palette.append(pq2.pop().avg)
+    return palette
+
+
+def extract_palette(image_rgb: np.ndarray, color_count: int = 5) -> List[Tuple[int, int, int]]:
+    """
+    Extract a colour palette from a decoded image.
+
+    Equivalent to ``ColorThief.get_palette(color_count, quality=1)``; the first
+    entry is what ``ColorThief.get_color()`` reports as the dominant colour.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        color_count: Requested palette size
+
+    Returns:
+        Palette colours as (r, g, b) tuples, dominant colour first
+    """
+    return quantize(color_histogram(image_rgb), color_count)
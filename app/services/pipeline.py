@@ -0,0 +1,214 @@
+"""
+Image work as a graph of named, memoized stages.
+
+Each stage declares the stages it consumes and the parameters its own output
+depends on. A Pipeline evaluates stages for one image on demand, computing
+each at most once, and stores cacheable outputs in the process-wide array
+cache under the image's content hash plus every parameter upstream of the
+stage. Detection and adjustment therefore share whatever they have in
+common: a skin tone adjustment at the analysis resolution reuses the header,
+decode and resize that detection already paid for, and a second adjustment
+of the same upload starts from the cached skin statistics.
+
+New operations are added by registering a stage with register_stage().
+"""
+import logging
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.timing import stage as timed
+from app.models.color_model import SkinTone
+from app.services.array_cache import array_cache
+from app.services.color_lut import ColorLUT, build_tone_lut, skin_hsv_mean, tone_factors
+from app.services.face_regions import detect_faces
+from app.services.image_encoder import EncodedImage, EncodeOptions, encode_image
+from app.services.image_loader import ImageSource, choose_reduction, load_rgb, read_image_header, resize_to_max_side
+from app.services.palette import extract_palette
+from app.services.skin_stats import SkinStats, region_statistics, skin_statistics
+
+logger = logging.getLogger(__name__)
+
+
+class Stage(NamedTuple):
+    """A node of the pipeline graph."""
+
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    params: Tuple[str, ...]
+    cached: bool
+
+
+STAGES: Dict[str, Stage] = {}
+
+# Parameters every pipeline has unless the caller overrides them
+DEFAULT_PARAMS: Dict[str, Callable[[], Any]] = {
+    "skin_rule": lambda: settings.skin_rule,
+    "face_cascade": lambda: settings.face_cascade,
+    "encode_options": EncodeOptions,
+}
+
+
+def register_stage(
+    name: str, inputs: Tuple[str, ...] = (), params: Tuple[str, ...] = (), cached: bool = True
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Register fn as the stage name.
+
+    fn is called with the outputs of inputs as positional arguments, in
+    order, followed by params as keyword arguments. The input "source" is
+    the image itself (a path or encoded bytes).
+
+    Args:
+        name: Stage name, unique across the graph
+        inputs: Names of the stages (or "source") fn consumes
+        params: Names of the pipeline parameters fn's output depends on
+        cached: Store the output in the array cache when the image's
+            content hash is known; outputs that are cheap or large and
+            short-lived should set this to False
+    """
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if name in STAGES:
+            raise ValueError(f"Stage '{name}' is already registered")
+        for upstream in inputs:
+            if upstream != "source" and upstream not in STAGES:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{upstream}'")
+        STAGES[name] = Stage(fn, tuple(inputs), tuple(params), cached)
+        return fn
+
+    return decorator
+
+
+def stage_params(name: str) -> Tuple[str, ...]:
+    """All parameters a stage's output depends on, its own and upstream, sorted."""
+    stage_def = STAGES[name]
+    names = set(stage_def.params)
+    for upstream in stage_def.inputs:
+        if upstream != "source":
+            names.update(stage_params(upstream))
+    return tuple(sorted(names))
+
+
+class Pipeline:
+    """
+    Evaluate stages for one image, computing each at most once.
+
+    Example:
+        pipeline = Pipeline(data, digest, max_side=512)
+        stats = pipeline.get("skin_stats")
+        palette = pipeline.get("palette")  # reuses the decode and resize
+    """
+
+    def __init__(self, source: ImageSource, digest: Optional[str] = None, **params: Any):
+        """
+        Args:
+            source: Path to the image file or its encoded bytes
+            digest: SHA-256 of the encoded image; enables sharing stage
+                outputs with other pipelines through the array cache
+            **params: Stage parameters, such as max_side or target_tone
+        """
+        self.source = source
+        self.digest = digest
+        self.params = {name: default() for name, default in DEFAULT_PARAMS.items()}
+        self.params.update(params)
+        self._results: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        """
+        Return a stage's output, evaluating it and its inputs if needed.
+
+        Raises:
+            KeyError: If the stage is unknown or a parameter it needs is missing
+        """
+        if name == "source":
+            return self.source
+        if name in self._results:
+            return self._results[name]
+
+        stage_def = STAGES[name]
+        if self.digest is not None and stage_def.cached:
+            value = array_cache.get_or_compute(self._cache_key(name), lambda: self._compute(name, stage_def))
+        else:
+            value = self._compute(name, stage_def)
+        self._results[name] = value
+        return value
+
+    def _compute(self, name: str, stage_def: Stage) -> Any:
+        inputs = [self.get(upstream) for upstream in stage_def.inputs]
+        kwargs = {param: self._param(name, param) for param in stage_def.params}
+        with timed(name):
+            return stage_def.fn(*inputs, **kwargs)
+
+    def _param(self, name: str, param: str) -> Any:
+        try:
+            return self.params[param]
+        except KeyError:
+            raise KeyError(f"Stage '{name}' needs the pipeline parameter '{param}'") from None
+
+    def _cache_key(self, name: str) -> Hashable:
+        params = {param: self._param(name, param) for param in stage_params(name)}
+        return array_cache.make_key(self.digest, name, **params)
+
+
+@register_stage("header", inputs=("source",))
+def _header(source: ImageSource) -> Tuple[str, int, int]:
+    return read_image_header(source)
+
+
+@register_stage("reduction", inputs=("header",), params=("max_side",), cached=False)
+def _reduction(header: Tuple[str, int, int], max_side: int) -> int:
+    return choose_reduction(*header, max_side)
+
+
+# Not cached itself: "resize" holds the decoded array (often the very same
+# object), and caching both would count its bytes twice against the budget
+@register_stage("decode", inputs=("source", "reduction"), cached=False)
+def _decode(source: ImageSource, reduction: int) -> np.ndarray:
+    return load_rgb(source, reduction)
+
+
+@register_stage("resize", inputs=("decode",), params=("max_side",))
+def _resize(decoded: np.ndarray, max_side: int) -> np.ndarray:
+    return resize_to_max_side(decoded, max_side)
+
+
+@register_stage("palette", inputs=("resize",))
+def _palette(image_rgb: np.ndarray) -> Tuple[Tuple[int, int, int], ...]:
+    return tuple(extract_palette(image_rgb, color_count=5))
+
+
+@register_stage("faces", inputs=("resize",), params=("face_cascade",))
+def _faces(image_rgb: np.ndarray, face_cascade: str) -> Tuple[Tuple[int, int, int, int], ...]:
+    return tuple(detect_faces(image_rgb))
+
+
+@register_stage("skin_stats", inputs=("resize",), params=("skin_rule",))
+def _skin_stats(image_rgb: np.ndarray, skin_rule: str) -> SkinStats:
+    return skin_statistics(image_rgb)
+
+
+@register_stage("face_stats", inputs=("resize", "faces"), params=("skin_rule",))
+def _face_stats(image_rgb: np.ndarray, boxes: Tuple[Tuple[int, int, int, int], ...], skin_rule: str) -> SkinStats:
+    return region_statistics(image_rgb, list(boxes))
+
+
+@register_stage("skin_hsv_mean", inputs=("resize",), params=("skin_rule",))
+def _skin_hsv_mean(image_rgb: np.ndarray, skin_rule: str) -> Optional[np.ndarray]:
+    return skin_hsv_mean(image_rgb)
+
+
+@register_stage("tone_lut", inputs=("skin_hsv_mean",), params=("target_tone",))
+def _tone_lut(mean_hsv: Optional[np.ndarray], target_tone: SkinTone) -> Optional[ColorLUT]:
+    # No skin, nothing to re-tone
+    return None if mean_hsv is None else build_tone_lut(tone_factors(mean_hsv, target_tone))
+
+
+@register_stage("transform", inputs=("resize", "tone_lut"), cached=False)
+def _transform(image_rgb: np.ndarray, lut: Optional[ColorLUT]) -> np.ndarray:
+    return image_rgb if lut is None else lut.apply(image_rgb)
+
+
+@register_stage("encode", inputs=("transform",), params=("encode_options",), cached=False)
+def _encode(image_rgb: np.ndarray, encode_options: EncodeOptions) -> EncodedImage:
+    return encode_image(image_rgb, encode_options)
@@ -0,0 +1,148 @@
+"""
+Skin segmentation through a precomputed RGB lookup table.
+
+A composite skin rule is evaluated once over all 2^24 RGB colours and stored
+as a 16 MB byte table. Masking an image is then a single gather per pixel with
+no colour-space conversion, and its cost does not depend on how complex the
+rule is: a combined HSV + YCrCb rule costs the same at runtime as one range.
+
+A rule that is a single colour conversion plus cv2.inRange is not compiled.
+OpenCV's vectorized conversion streams through the image faster than the
+gather, whose random reads into 16 MB miss the CPU caches (about 33 ms against
+60 ms at 12 MP for the default 'hsv' rule), so such rules are evaluated
+directly and keep no table resident.
+"""
+import threading
+from typing import Callable, Dict, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+
+# A rule maps an HxWx3 uint8 RGB image to a mask that is non-zero for skin
+SkinRule = Callable[[np.ndarray], np.ndarray]
+
+
+def hsv_rule(lower: Sequence[int] = (0, 20, 70), upper: Sequence[int] = (20, 255, 255)) -> SkinRule:
+    """Skin as an OpenCV HSV range (H in 0-179)."""
+    lower_skin = np.array(lower, dtype=np.uint8)
+    upper_skin = np.array(upper, dtype=np.uint8)
+
+    def rule(image_rgb: np.ndarray) -> np.ndarray:
+        return cv2.inRange(cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV), lower_skin, upper_skin)
+
+    rule.conversions = 1
+    return rule
+
+
+def ycrcb_rule(lower: Sequence[int] = (0, 133, 77), upper: Sequence[int] = (255, 173, 127)) -> SkinRule:
+    """Skin as a YCrCb range; the default Cr/Cb box is the usual chroma-only skin rule."""
+    lower_skin = np.array(lower, dtype=np.uint8)
+    upper_skin = np.array(upper, dtype=np.uint8)
+
+    def rule(image_rgb: np.ndarray) -> np.ndarray:
+        return cv2.inRange(cv2.cvtColor(image_rgb, cv2.COLOR_RGB2YCrCb), lower_skin, upper_skin)
+
+    rule.conversions = 1
+    return rule
+
+
+def all_of(*rules: SkinRule) -> SkinRule:
+    """Combine rules so a colour is skin only if every rule accepts it."""
+    def rule(image_rgb: np.ndarray) -> np.ndarray:
+        mask = rules[0](image_rgb) > 0
+        for other in rules[1:]:
+            mask &= other(image_rgb) > 0
+        return mask
+
+    rule.conversions = sum(rule_conversions(other) for other in rules)
+    return rule
+
+
+def rule_conversions(rule: SkinRule) -> int:
+    """Colour conversions a rule runs per call; rules that do not say are assumed costly."""
+    return getattr(rule, "conversions", 2)
+
+
+# Named rules selectable through settings.skin_rule
+SKIN_RULES: Dict[str, SkinRule] = {
+    "hsv": hsv_rule(),
+    "ycrcb": ycrcb_rule(),
+    "hsv+ycrcb": all_of(hsv_rule(), ycrcb_rule()),
+}
+
+
+class SkinTable:
+    """
+    A skin rule compiled into a lookup table over every RGB colour.
+
+    Rules with a single colour conversion are cheaper to run than to look up,
+    so for them no table is built and lookup() calls the rule itself.
+    """
+
+    def __init__(self, rule: SkinRule):
+        self.rule = rule
+        self.table: Optional[np.ndarray] = None
+        if rule_conversions(rule) <= 1:
+            return
+
+        # One 256x256 slice of the RGB cube per red value, so the rule only
+        # ever sees a small image; rows are green, columns are blue
+        green, blue = np.mgrid[0:256, 0:256].astype(np.uint8)
+        table = np.empty((256, 256, 256), dtype=np.uint8)
+        cube_slice = np.empty((256, 256, 3), dtype=np.uint8)
+        cube_slice[..., 1] = green
+        cube_slice[..., 2] = blue
+        for red in range(256):
+            cube_slice[..., 0] = red
+            table[red] = np.where(rule(cube_slice) > 0, 255, 0)
+
+        # Indexed by (r << 16) | (g << 8) | b
+        self.table = table.reshape(-1)
+
+    def lookup(self, image_rgb: np.ndarray) -> np.ndarray:
+        """
+        Compute the skin mask of an image.
+
+        Args:
+            image_rgb: HxWx3 uint8 array in RGB channel order
+
+        Returns:
+            HxW uint8 mask, 255 for skin and 0 elsewhere (like cv2.inRange)
+        """
+        if self.table is None:
+            return self.rule(image_rgb)
+        # Swapping to BGRA lays each pixel out as the little-endian uint32
+        # b | g << 8 | r << 16 | a << 24; clearing alpha leaves the table index
+        packed = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGRA).view(np.uint32)[..., 0]
+        np.bitwise_and(packed, 0xFFFFFF, out=packed)
+        return np.take(self.table, packed)
+
+
+_tables: Dict[str, SkinTable] = {}
+_tables_lock = threading.Lock()
+
+
+def get_skin_table(rule_name: Optional[str] = None) -> SkinTable:
+    """
+    Return the compiled table for a named rule, building it on first use.
+
+    Args:
+        rule_name: Key of SKIN_RULES; defaults to settings.skin_rule
+    """
+    rule_name = rule_name or settings.skin_rule
+    table = _tables.get(rule_name)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(rule_name)
+            if table is None:
+                if rule_name not in SKIN_RULES:
+                    raise ValueError(f"Unknown skin rule: {rule_name}")
+                table = _tables[rule_name] = SkinTable(SKIN_RULES[rule_name])
+    return table
+
+
+def skin_mask(image_rgb: np.ndarray, rule_name: Optional[str] = None) -> np.ndarray:
+    """Compute an image's skin mask (255 = skin) with the configured rule's table."""
+    return get_skin_table(rule_name).lookup(image_rgb)
@@ -0,0 +1,150 @@
+"""
+Sampling estimator for approximate skin tone analysis.
+
+Instead of masking every pixel, pixels are drawn from a grid of equal-area
+strata (the same number from every cell, so the sample covers the whole
+frame) in rounds of doubling size. After each round a normal confidence
+interval is formed on the mean L* of the skin pixels sampled so far, and
+sampling stops as soon as both ends of the interval fall in the same
+SkinTone bucket: more samples could narrow the interval, but could no longer
+change the classification.
+
+The interval treats the skin samples as independent draws, which is
+conservative for a stratified sample. The random generator is seeded, so the
+same image always yields the same estimate.
+"""
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.color_model import classify_lightness
+from app.services.color_space import srgb_to_lab
+from app.services.skin_mask import SkinTable, get_skin_table
+
+# Strata per image side; capped by the image's own size
+STRATA_PER_SIDE = 16
+
+# Skin samples required before the interval is trusted
+MIN_SKIN_SAMPLES = 64
+
+SAMPLING_SEED = 0
+
+
+@dataclass
+class LightnessEstimate:
+    """Sampled estimate of the mean L* of an image's skin pixels."""
+
+    sample_count: int
+    skin_count: int
+    lightness: Optional[float]
+    interval: Optional[Tuple[float, float]]
+    mean_rgb: Optional[np.ndarray]
+    converged: bool
+    pixels: np.ndarray
+
+    @property
+    def fraction(self) -> float:
+        """Estimated share of pixels classified as skin."""
+        return self.skin_count / self.sample_count if self.sample_count else 0.0
+
+
+def _strata(length: int) -> np.ndarray:
+    """Boundaries of up to STRATA_PER_SIDE equal cells along one side."""
+    cells = max(1, min(STRATA_PER_SIDE, length))
+    return np.linspace(0, length, cells + 1).astype(np.int64)
+
+
+def _draw(image_rgb: np.ndarray, per_cell: int, rng: np.random.Generator) -> np.ndarray:
+    """Draw per_cell pixels uniformly from every stratum; returns (N, 3) uint8."""
+    height, width = image_rgb.shape[:2]
+    row_edges, col_edges = _strata(height), _strata(width)
+    tops, lefts = np.meshgrid(row_edges[:-1], col_edges[:-1], indexing="ij")
+    heights, widths = np.meshgrid(np.diff(row_edges), np.diff(col_edges), indexing="ij")
+
+    tops, lefts = np.repeat(tops.ravel(), per_cell), np.repeat(lefts.ravel(), per_cell)
+    heights, widths = np.repeat(heights.ravel(), per_cell), np.repeat(widths.ravel(), per_cell)
+    rows = tops + (rng.random(len(tops)) * heights).astype(np.int64)
+    cols = lefts + (rng.random(len(lefts)) * widths).astype(np.int64)
+    return image_rgb[rows, cols]
+
+
+def estimate_skin_lightness(
+    image_rgb: np.ndarray,
+    table: Optional[SkinTable] = None,
+    confidence: Optional[float] = None,
+    initial_samples: Optional[int] = None,
+    max_samples: Optional[int] = None,
+) -> LightnessEstimate:
+    """
+    Estimate the mean L* of the skin pixels from a growing stratified sample.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+        confidence: Confidence level of the interval; defaults to
+            settings.sampling_confidence
+        initial_samples: Size of the first round; defaults to
+            settings.sampling_initial_samples
+        max_samples: Pixel budget; defaults to settings.sampling_max_samples
+
+    Returns:
+        LightnessEstimate; lightness and interval are None if no skin was sampled
+    """
+    table = table or get_skin_table()
+    confidence = confidence or settings.sampling_confidence
+    initial_samples = initial_samples or settings.sampling_initial_samples
+    max_samples = max_samples or settings.sampling_max_samples
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    height, width = image_rgb.shape[:2]
+    cells = (len(_strata(height)) - 1) * (len(_strata(width)) - 1)
+    per_cell = max(1, initial_samples // cells)
+    rng = np.random.default_rng(SAMPLING_SEED)
+
+    drawn: List[np.ndarray] = []
+    sample_count = skin_count = 0
+    lightness_sum = lightness_sq_sum = 0.0
+    channel_sums = np.zeros(3, dtype=np.int64)
+    lightness = interval = None
+    converged = False
+
+    while True:
+        pixels = _draw(image_rgb, per_cell, rng)
+        drawn.append(pixels)
+        sample_count += len(pixels)
+
+        skin_pixels = pixels[table.lookup(pixels[np.newaxis])[0] > 0]
+        if len(skin_pixels):
+            lab_lightness = srgb_to_lab(skin_pixels)[:, 0].astype(np.float64)
+            skin_count += len(skin_pixels)
+            lightness_sum += lab_lightness.sum()
+            lightness_sq_sum += np.square(lab_lightness).sum()
+            channel_sums += skin_pixels.sum(axis=0, dtype=np.int64)
+
+        if skin_count:
+            lightness = float(lightness_sum / skin_count)
+        if skin_count >= 2:
+            variance = max(0.0, (lightness_sq_sum - skin_count * lightness ** 2) / (skin_count - 1))
+            margin = z * (variance / skin_count) ** 0.5
+            interval = (float(lightness - margin), float(lightness + margin))
+            if skin_count >= MIN_SKIN_SAMPLES and classify_lightness(interval[0]) == classify_lightness(interval[1]):
+                converged = True
+                break
+
+        # Double the sample each round until the budget is spent
+        if sample_count >= max_samples:
+            break
+        per_cell = max(1, min(sample_count, max_samples - sample_count) // cells)
+
+    return LightnessEstimate(
+        sample_count=sample_count,
+        skin_count=skin_count,
+        lightness=lightness,
+        interval=interval,
+        mean_rgb=channel_sums / skin_count if skin_count else None,
+        converged=converged,
+        pixels=np.concatenate(drawn),
+    )
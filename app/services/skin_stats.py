@@ -0,0 +1,361 @@
+"""
+Fused skin statistics kernel.
+
+Computes the skin mask, per-channel sums over skin pixels, the skin pixel count,
+the skin fraction and per-pixel CIE Lab statistics in one pass over the image.
+The image is walked in horizontal strips so every temporary (mask, luminance,
+sampled pixels) is strip-sized; no image-sized intermediate is ever allocated.
+
+Skin pixels are never gathered out of the image, which with the per-channel
+reduction that followed it used to cost more than everything else together.
+Sums and counts come from masked OpenCV reductions, and lightness from a masked
+histogram of every pixel's luminance: L* is a monotonic function of luminance
+alone, so a fine luminance histogram is mapped onto the fine L* histogram once
+per image, and the median and any percentile are read off that. Only the mean
+a* and b* need a full Lab conversion, which runs on a regular subset of the
+skin pixels.
+
+batch_statistics covers the opposite shape: many small items (face crops,
+thumbnails) stacked into one array and reduced per item in a single pass.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.color_space import lightness_from_luminance, srgb_to_lab, srgb_to_lightness, srgb_to_luminance
+from app.services.image_loader import resize_to_max_side
+from app.services.skin_mask import SkinTable, get_skin_table
+
+# Pixels per strip; small enough for the temporaries to stay in cache
+STRIP_PIXELS = 1 << 16
+
+# L* histogram resolution used for medians and percentiles (0.1 L* per bin)
+LIGHTNESS_BINS_PER_UNIT = 10
+LIGHTNESS_BINS = 100 * LIGHTNESS_BINS_PER_UNIT
+
+# Luminance histogram resolution; 2^16 levels put L* within 0.015 of exact
+# even near black, where L* is steepest
+LUMINANCE_BINS = 1 << 16
+
+# Upper edge of the luminance histogram, just above white's Y of 1, which
+# float rounding may put a hair over 1
+_LUMINANCE_MAX = 1.001
+
+# Fine L* bin and L* value of every luminance bin's centre
+_LUMINANCE_CENTRES = (np.arange(LUMINANCE_BINS) + 0.5) * (_LUMINANCE_MAX / LUMINANCE_BINS)
+_CENTRE_LIGHTNESS = lightness_from_luminance(_LUMINANCE_CENTRES).astype(np.float64)
+
+# cv2.calcHist accumulates in float32, which counts exactly up to 2^24
+_EXACT_FLOAT32_COUNT = 1 << 24
+
+# Pixel grid step, per axis, of the subset converted to full Lab for the
+# a*/b* means (1 pixel in 16)
+CHROMA_SAMPLE_STRIDE = 4
+
+# Bin width of the coarse histogram reported in analysis metadata
+REPORTED_BIN_WIDTH = 5
+
+# Longest side a region is scaled down to before it joins a batch
+BATCH_REGION_MAX_SIDE = 128
+
+
+def _empty_histogram() -> np.ndarray:
+    return np.zeros(LIGHTNESS_BINS, dtype=np.int64)
+
+
+def lightness_bins(lightness: np.ndarray) -> np.ndarray:
+    """Map L* values to fine histogram bin indices."""
+    return np.clip((lightness * LIGHTNESS_BINS_PER_UNIT).astype(np.int32), 0, LIGHTNESS_BINS - 1)
+
+
+def histogram_percentiles(histograms: np.ndarray, q: float) -> np.ndarray:
+    """
+    Read a percentile off every row of a stack of fine L* histograms at once.
+
+    Args:
+        histograms: (..., LIGHTNESS_BINS) counts
+        q: Percentile in 0-100
+
+    Returns:
+        (...) array of L* values, interpolated within the bin; NaN for empty rows
+    """
+    cumulative = np.cumsum(histograms, axis=-1)
+    total = cumulative[..., -1]
+    target = q / 100 * total
+    # Per-row searchsorted: the first bin whose cumulative count reaches the target
+    index = np.minimum((cumulative < target[..., np.newaxis]).sum(axis=-1), LIGHTNESS_BINS - 1)
+    in_bin = np.take_along_axis(histograms, index[..., np.newaxis], axis=-1)[..., 0]
+    before = np.take_along_axis(cumulative, index[..., np.newaxis], axis=-1)[..., 0] - in_bin
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(in_bin > 0, (target - before) / in_bin, 0.0)
+        return np.where(total > 0, (index + fraction) / LIGHTNESS_BINS_PER_UNIT, np.nan)
+
+
+def histogram_percentile(histogram: np.ndarray, q: float) -> float:
+    """
+    Read a percentile off a fine L* histogram, interpolating within the bin.
+
+    Args:
+        histogram: Counts per LIGHTNESS_BINS bin
+        q: Percentile in 0-100
+
+    Returns:
+        The L* value below which q percent of the counted pixels fall
+    """
+    return float(histogram_percentiles(histogram, q))
+
+
+@dataclass
+class SkinStats:
+    """Accumulated statistics over the skin pixels of an image or region."""
+
+    pixel_count: int = 0
+    skin_count: int = 0
+    channel_sums: np.ndarray = field(default_factory=lambda: np.zeros(3, dtype=np.int64))
+    lightness_sum: float = 0.0
+    chroma_sums: np.ndarray = field(default_factory=lambda: np.zeros(2, dtype=np.float64))
+    chroma_count: int = 0
+    lightness_histogram: np.ndarray = field(default_factory=_empty_histogram)
+
+    @property
+    def fraction(self) -> float:
+        """Share of pixels classified as skin."""
+        return self.skin_count / self.pixel_count if self.pixel_count else 0.0
+
+    @property
+    def mean(self) -> Optional[np.ndarray]:
+        """Mean RGB colour of the skin pixels, or None if there are none."""
+        if not self.skin_count:
+            return None
+        return self.channel_sums / self.skin_count
+
+    @property
+    def lab_mean(self) -> Optional[np.ndarray]:
+        """Mean (L*, a*, b*) over the skin pixels (a* and b* from the sampled subset), or None."""
+        if not self.skin_count:
+            return None
+        chroma = self.chroma_sums / max(1, self.chroma_count)
+        return np.array([self.lightness_sum / self.skin_count, chroma[0], chroma[1]])
+
+    def lightness_percentile(self, q: float) -> float:
+        """L* percentile (0-100) over the skin pixels, from the fine histogram."""
+        return histogram_percentile(self.lightness_histogram, q)
+
+    @property
+    def median_lightness(self) -> float:
+        """Median L* over the skin pixels (NaN if there are none)."""
+        return self.lightness_percentile(50)
+
+    def lab_summary(self) -> Dict[str, object]:
+        """Robust Lab statistics in the form reported by detect_skin_tone."""
+        coarse = self.lightness_histogram.reshape(-1, REPORTED_BIN_WIDTH * LIGHTNESS_BINS_PER_UNIT).sum(axis=1)
+        percentiles: Dict[str, float] = {
+            f"p{q}": self.lightness_percentile(q) for q in (10, 25, 50, 75, 90)
+        }
+        histogram_counts: List[int] = coarse.tolist()
+        return {
+            "mean": self.lab_mean.tolist(),
+            "median_lightness": percentiles["p50"],
+            "lightness_percentiles": percentiles,
+            "lightness_histogram": {
+                "bin_width": REPORTED_BIN_WIDTH,
+                "counts": histogram_counts,
+            },
+        }
+
+    def merge(self, other: "SkinStats") -> "SkinStats":
+        """Combine statistics of two disjoint regions."""
+        return SkinStats(
+            self.pixel_count + other.pixel_count,
+            self.skin_count + other.skin_count,
+            self.channel_sums + other.channel_sums,
+            self.lightness_sum + other.lightness_sum,
+            self.chroma_sums + other.chroma_sums,
+            self.chroma_count + other.chroma_count,
+            self.lightness_histogram + other.lightness_histogram,
+        )
+
+
+def strip_rows(width: int) -> int:
+    """Number of image rows per strip for a given image width."""
+    return max(1, STRIP_PIXELS // max(1, width))
+
+
+def skin_statistics(image_rgb: np.ndarray, table: Optional[SkinTable] = None) -> SkinStats:
+    """
+    Compute skin pixel statistics in a single strip-wise pass.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order (views are fine)
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+
+    Returns:
+        SkinStats with exact integer channel sums, the fine L* histogram
+        and L* sum over the skin pixels, and a*/b* sums over the skin pixels
+        on a CHROMA_SAMPLE_STRIDE grid
+    """
+    table = table or get_skin_table()
+    height, width = image_rgb.shape[:2]
+    rows = strip_rows(width)
+    stats = SkinStats(pixel_count=height * width)
+    luminance_histogram = np.zeros(LUMINANCE_BINS, dtype=np.float64)
+    pending: Optional[np.ndarray] = None
+    pending_count = 0
+
+    for top in range(0, height, rows):
+        strip = image_rgb[top:top + rows]
+        mask = table.lookup(strip)
+        count = cv2.countNonZero(mask)
+        if not count:
+            continue
+        stats.skin_count += count
+        # The masked mean times the count is the exact integer sum, up to rounding
+        stats.channel_sums += np.rint(np.array(cv2.mean(strip, mask=mask)[:3]) * count).astype(np.int64)
+
+        if pending_count + count > _EXACT_FLOAT32_COUNT:
+            luminance_histogram += pending.ravel()
+            pending, pending_count = None, 0
+        pending = cv2.calcHist(
+            [srgb_to_luminance(strip)], [0], mask, [LUMINANCE_BINS], [0, _LUMINANCE_MAX], pending,
+            accumulate=pending is not None
+        )
+        pending_count += count
+
+        grid = (slice(None, None, CHROMA_SAMPLE_STRIDE), slice(None, None, CHROMA_SAMPLE_STRIDE))
+        sample = strip[grid][mask[grid] > 0]
+        if not len(sample) and not stats.chroma_count:
+            # The grid missed this strip's skin and nothing has been sampled
+            # yet, as in a small region; take all of it so a* and b* are known
+            sample = strip[mask > 0]
+        stats.chroma_sums += srgb_to_lab(sample)[:, 1:].sum(axis=0, dtype=np.float64)
+        stats.chroma_count += len(sample)
+
+    if pending is not None:
+        luminance_histogram += pending.ravel()
+    stats.lightness_histogram = np.rint(np.bincount(
+        lightness_bins(_CENTRE_LIGHTNESS), weights=luminance_histogram, minlength=LIGHTNESS_BINS
+    )).astype(np.int64)
+    stats.lightness_sum = float(_CENTRE_LIGHTNESS @ luminance_histogram)
+    return stats
+
+
+def region_statistics(
+    image_rgb: np.ndarray, boxes: Sequence[Tuple[int, int, int, int]], table: Optional[SkinTable] = None
+) -> SkinStats:
+    """
+    Compute skin pixel statistics over rectangular regions only.
+
+    Each region is a view into the image, so no pixels are copied and pixels
+    outside the regions are never touched.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        boxes: Non-overlapping (x, y, width, height) regions
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+
+    Returns:
+        SkinStats merged over all regions; pixel_count is the regions' area
+    """
+    table = table or get_skin_table()
+    stats = SkinStats()
+    for x, y, w, h in boxes:
+        stats = stats.merge(skin_statistics(image_rgb[y:y + h, x:x + w], table))
+    return stats
+
+
+@dataclass
+class BatchStats:
+    """Per-item skin statistics for a batch of images or regions."""
+
+    pixel_counts: np.ndarray
+    skin_counts: np.ndarray
+    mean_rgb: np.ndarray
+    median_lightness: np.ndarray
+
+    @property
+    def fractions(self) -> np.ndarray:
+        """Share of each item's pixels classified as skin."""
+        return self.skin_counts / np.maximum(self.pixel_counts, 1)
+
+
+def stack_regions(
+    image_rgb: np.ndarray, boxes: Sequence[Tuple[int, int, int, int]], max_side: int = BATCH_REGION_MAX_SIDE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Crop regions into one zero-padded stack for batch_statistics.
+
+    Regions larger than max_side are downscaled first, which bounds both the
+    batch size and the padding wasted on small regions next to large ones.
+
+    Args:
+        image_rgb: HxWx3 uint8 array in RGB channel order
+        boxes: (x, y, width, height) regions
+        max_side: Longest side a region is scaled down to
+
+    Returns:
+        Tuple of the NxHxWx3 uint8 stack and the NxHxW bool mask of real
+        (non-padding) pixels
+    """
+    crops = [resize_to_max_side(image_rgb[y:y + h, x:x + w], max_side) for x, y, w, h in boxes]
+    height = max(crop.shape[0] for crop in crops)
+    width = max(crop.shape[1] for crop in crops)
+    stack = np.zeros((len(crops), height, width, 3), dtype=np.uint8)
+    valid = np.zeros((len(crops), height, width), dtype=bool)
+    for index, crop in enumerate(crops):
+        stack[index, :crop.shape[0], :crop.shape[1]] = crop
+        valid[index, :crop.shape[0], :crop.shape[1]] = True
+    return stack, valid
+
+
+def batch_statistics(
+    stack: np.ndarray, valid: Optional[np.ndarray] = None, table: Optional[SkinTable] = None
+) -> BatchStats:
+    """
+    Compute skin statistics for every item of a stack at once.
+
+    Masking, Lab lightness, the per-item L* histograms and their medians
+    each run as one array operation over the whole stack instead of once
+    per item.
+
+    Args:
+        stack: NxHxWx3 uint8 array in RGB channel order
+        valid: Optional NxHxW bool mask of pixels to consider (e.g. padding excluded)
+        table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+
+    Returns:
+        BatchStats; mean_rgb and median_lightness are NaN for items without skin
+    """
+    table = table or get_skin_table()
+    count, height, width = stack.shape[:3]
+    pixels = stack.reshape(count, -1, 3)
+
+    # Skin lookup works on any HxWx3 array, so the stack is masked as one tall image
+    skin = table.lookup(stack.reshape(count * height, width, 3)).reshape(count, -1) > 0
+    if valid is not None:
+        skin &= valid.reshape(count, -1)
+        pixel_counts = valid.reshape(count, -1).sum(axis=1)
+    else:
+        pixel_counts = np.full(count, height * width)
+    skin_counts = skin.sum(axis=1)
+
+    # Skin pixels come out grouped by item, in item order
+    skin_pixels = pixels.reshape(-1, 3)[skin.ravel()]
+    items = np.repeat(np.arange(count), skin_counts)
+
+    # Every item gets its own LIGHTNESS_BINS slice of one bincount, so the
+    # per-item histograms (and from them the medians) come out of one call
+    bins = items * LIGHTNESS_BINS + lightness_bins(srgb_to_lightness(skin_pixels))
+    histograms = np.bincount(bins, minlength=count * LIGHTNESS_BINS).reshape(count, LIGHTNESS_BINS)
+    median_lightness = histogram_percentiles(histograms, 50)
+
+    # Per-item channel sums as differences of one running sum
+    running = np.zeros((len(skin_pixels) + 1, 3), dtype=np.int64)
+    np.cumsum(skin_pixels, axis=0, dtype=np.int64, out=running[1:])
+    ends = np.cumsum(skin_counts)
+    channel_sums = running[ends] - running[ends - skin_counts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_rgb = channel_sums / skin_counts[:, np.newaxis]
+
+    return BatchStats(pixel_counts, skin_counts, mean_rgb, median_lightness)
@@ -0,0 +1,195 @@
+"""
+Per-session working sets for interactive skin tone sliders.
+
+A slider position maps continuously onto the TARGET_HSV anchors, from
+VERY_LIGHT at 0 to VERY_DARK at 1. Opening a session decodes the preview once
+and keeps its pixels, the flat indices of its skin pixels, their OpenCV HSV
+values and their mean resident. A slider move then only rebuilds three
+256-entry channel tables, maps the skin pixels through them with cv2.LUT,
+converts those pixels back to RGB and scatters them into a copy of the
+preview; nothing proportional to the full image is recomputed.
+
+Sessions are built in the worker pool, but live in the API process, so every
+request finds its session whatever the pool kind, and expire after
+settings.tone_session_ttl seconds of inactivity. Renders run on the event
+loop's default executor next to the session; at most
+settings.tone_render_limit run at once and further ones are rejected as busy.
+"""
+import asyncio
+import functools
+import logging
+import threading
+import uuid
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError, ErrorCode
+from app.models.color_model import SkinTone
+from app.services.color_lut import TARGET_HSV, hsv_factors
+from app.services.image_encoder import EncodedImage, EncodeOptions, encode_image
+from app.services.skin_mask import SkinTable, get_skin_table
+
+logger = logging.getLogger(__name__)
+
+# Slider position of each SkinTone anchor, lightest first
+TONE_POSITIONS: Dict[SkinTone, float] = {
+    tone: index / (len(SkinTone) - 1) for index, tone in enumerate(SkinTone)
+}
+
+_ANCHOR_POSITIONS = np.array(list(TONE_POSITIONS.values()))
+_ANCHOR_HSV = np.array([TARGET_HSV[tone] for tone in TONE_POSITIONS], dtype=np.float64)
+
+
+def target_hsv_at(position: float) -> np.ndarray:
+    """
+    Target skin HSV at a slider position, interpolated between the tone anchors.
+
+    Args:
+        position: 0 (VERY_LIGHT) to 1 (VERY_DARK)
+
+    Returns:
+        (h, s, v) target in OpenCV HSV
+    """
+    return np.array([np.interp(position, _ANCHOR_POSITIONS, _ANCHOR_HSV[:, channel]) for channel in range(3)])
+
+
+class ToneSession:
+    """The resident working set of one image being re-toned interactively."""
+
+    def __init__(self, image_rgb: np.ndarray, table: Optional[SkinTable] = None):
+        """
+        Args:
+            image_rgb: HxWx3 uint8 preview in RGB channel order
+            table: Skin rule (compiled to a table only if it is multi-conversion); defaults to the configured rule
+        """
+        table = table or get_skin_table()
+        self.image_rgb = np.ascontiguousarray(image_rgb)
+        flat_rgb = self.image_rgb.reshape(-1, 3)
+        # int32 indices halve the working set; previews are far below 2^31 pixels
+        self.skin_index = np.flatnonzero(table.lookup(self.image_rgb).ravel()).astype(np.int32)
+        skin_rgb = flat_rgb[self.skin_index][:, np.newaxis]
+        self.skin_hsv = cv2.cvtColor(skin_rgb, cv2.COLOR_RGB2HSV)
+        self.mean_hsv = self.skin_hsv.reshape(-1, 3).mean(axis=0) if len(self.skin_index) else None
+
+    @property
+    def skin_fraction(self) -> float:
+        """Share of preview pixels classified as skin."""
+        return len(self.skin_index) / (self.image_rgb.shape[0] * self.image_rgb.shape[1])
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held resident by the session's arrays."""
+        return self.image_rgb.nbytes + self.skin_index.nbytes + self.skin_hsv.nbytes
+
+    def render(self, position: float) -> np.ndarray:
+        """
+        Re-tone the preview for a slider position.
+
+        Args:
+            position: 0 (VERY_LIGHT) to 1 (VERY_DARK)
+
+        Returns:
+            New HxWx3 uint8 RGB array
+        """
+        if self.mean_hsv is None:
+            return self.image_rgb.copy()
+        factors = hsv_factors(self.mean_hsv, target_hsv_at(position))
+        levels = np.arange(256, dtype=np.float64)[:, np.newaxis]
+        tables = np.clip(levels * factors, 0, 255).astype(np.uint8)[np.newaxis]
+        adjusted_rgb = cv2.cvtColor(cv2.LUT(self.skin_hsv, tables), cv2.COLOR_HSV2RGB)
+
+        output = self.image_rgb.copy()
+        output.reshape(-1, 3)[self.skin_index] = adjusted_rgb[:, 0]
+        return output
+
+    def render_encoded(self, position: float, output: Optional[EncodeOptions] = None) -> EncodedImage:
+        """Re-tone the preview and encode it; output defaults to the output_* settings."""
+        return encode_image(self.render(position), output)
+
+
+class ToneSessionStore:
+    """Bounded, expiring map of session id to ToneSession, with bounded concurrent renders."""
+
+    def __init__(self, max_sessions: int, ttl: float, max_renders: int):
+        self._sessions: TTLCache = TTLCache(maxsize=max(1, max_sessions), ttl=ttl)
+        self._lock = threading.Lock()
+        self.max_renders = max(1, max_renders)
+        # Admission is tracked on the event loop thread, like the worker pool's
+        self._rendering = 0
+        self.renders = 0
+        self.rejected = 0
+
+    def create(self, session: ToneSession) -> str:
+        """Register a session and return its id."""
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = session
+        logger.info(f"Opened tone session {session_id} ({session.nbytes / 1e6:.1f} MB resident)")
+        return session_id
+
+    def get(self, session_id: str) -> ToneSession:
+        """
+        Look up a session and restart its expiry clock.
+
+        Raises:
+            ApplicationError: NOT_FOUND if the session expired or never existed
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                # Re-inserting refreshes the TTL, so an active slider never expires
+                self._sessions[session_id] = session
+        if session is None:
+            raise ApplicationError(f"Tone session '{session_id}' not found or expired", ErrorCode.NOT_FOUND)
+        return session
+
+    async def render(self, session_id: str, position: float, output: Optional[EncodeOptions] = None) -> EncodedImage:
+        """
+        Re-tone and encode a session's preview off the event loop.
+
+        Raises:
+            ApplicationError: NOT_FOUND if the session expired or never
+                existed; SERVICE_BUSY if max_renders renders are running
+        """
+        session = self.get(session_id)
+        if self._rendering >= self.max_renders:
+            self.rejected += 1
+            raise ApplicationError(
+                "Too many tone renders in progress, please retry shortly",
+                ErrorCode.SERVICE_BUSY,
+                {"rendering": self._rendering, "max_renders": self.max_renders}
+            )
+        self._rendering += 1
+        try:
+            loop = asyncio.get_running_loop()
+            encoded = await loop.run_in_executor(None, functools.partial(session.render_encoded, position, output))
+        finally:
+            self._rendering -= 1
+        self.renders += 1
+        return encoded
+
+    def close(self, session_id: str) -> bool:
+        """Drop a session; returns whether it existed."""
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the open sessions, the bytes they hold and render counters."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(session.nbytes for session in sessions),
+            "rendering": self._rendering,
+            "max_renders": self.max_renders,
+            "renders": self.renders,
+            "rejected": self.rejected,
+        }
+
+
+# Process-wide session store used by the API routes
+tone_sessions = ToneSessionStore(settings.tone_session_limit, settings.tone_session_ttl, settings.tone_render_limit)
@@ -0,0 +1,182 @@
+"""Streaming multipart upload receiver with size enforcement and incremental hashing."""
+import hashlib
+import logging
+from typing import AsyncIterator, Dict, Optional, Union
+
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.error_handling import ApplicationError, ErrorCode
+
+logger = logging.getLogger(__name__)
+
+# Allowance for multipart boundaries, part headers and small form fields
+# when checking the request's Content-Length against the file size limit
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Upper bound for a plain (non-file) form field value
+MAX_FIELD_SIZE = 16 * 1024
+
+
+class ReceivedUpload:
+    """
+    The file part and form fields of a streamed multipart upload.
+
+    data is the receive buffer itself, not a bytes copy of it, so a request
+    holds one copy of the file at most. Consumers only read it.
+    """
+
+    def __init__(self, filename: str, data: Union[bytes, bytearray], sha256: str, fields: Dict[str, str]):
+        self.filename = filename
+        self.data = data
+        self.sha256 = sha256
+        self.fields = fields
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class _UploadReceiver:
+    """MultipartParser callbacks that keep the first file part and all text fields."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.filename: Optional[str] = None
+        self.buffer = bytearray()
+        self.hasher = hashlib.sha256()
+        self.fields: Dict[str, str] = {}
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._field_name: Optional[str] = None
+        self._field_value = bytearray()
+        self._in_file = False
+
+    def on_part_begin(self):
+        self._disposition = b""
+        self._field_name = None
+        self._field_value = bytearray()
+        self._in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise ApplicationError(
+                'Multipart part is missing the Content-Disposition "name"',
+                ErrorCode.VALIDATION_ERROR
+            )
+        self._field_name = options[b"name"].decode("utf-8", errors="replace")
+
+        if b"filename" in options:
+            if self.filename is not None:
+                raise ApplicationError("Only one file may be uploaded per request", ErrorCode.VALIDATION_ERROR)
+            self.filename = options[b"filename"].decode("utf-8", errors="replace")
+            self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self._in_file:
+            self._field_value += data[start:end]
+            if len(self._field_value) > MAX_FIELD_SIZE:
+                raise ApplicationError(f"Form field '{self._field_name}' is too large", ErrorCode.VALIDATION_ERROR)
+            return
+
+        # Reject as soon as the limit is crossed, before buffering more data
+        if len(self.buffer) + (end - start) > self.max_size:
+            raise ApplicationError(
+                f"Upload exceeds the maximum size of {self.max_size} bytes",
+                ErrorCode.UPLOAD_TOO_LARGE,
+                {"max_upload_size": self.max_size}
+            )
+        chunk = memoryview(data)[start:end]
+        self.hasher.update(chunk)
+        self.buffer += chunk
+
+    def on_part_end(self):
+        if not self._in_file and self._field_name is not None:
+            self.fields[self._field_name] = self._field_value.decode("utf-8", errors="replace")
+        self._in_file = False
+
+    @property
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+
+async def receive_upload(
+    chunks: AsyncIterator[bytes],
+    content_type: Optional[str],
+    max_size: int,
+    content_length: Optional[int] = None,
+) -> ReceivedUpload:
+    """
+    Receive a multipart/form-data upload chunk by chunk.
+
+    The file part is hashed while it streams in, so callers get its SHA-256
+    without a second pass over the data, and the request is rejected the
+    moment the file grows past max_size rather than after it is fully read.
+
+    Args:
+        chunks: Request body chunks, e.g. Starlette's request.stream()
+        content_type: The request's Content-Type header
+        max_size: Maximum file size in bytes
+        content_length: The request's Content-Length, used to reject
+            oversized bodies before reading anything
+
+    Returns:
+        The received file and form fields
+
+    Raises:
+        ApplicationError: If the body is not valid multipart, has no file,
+            or the file is larger than max_size
+    """
+    if content_length is not None and content_length > max_size + MULTIPART_OVERHEAD:
+        raise ApplicationError(
+            f"Upload exceeds the maximum size of {max_size} bytes",
+            ErrorCode.UPLOAD_TOO_LARGE,
+            {"max_upload_size": max_size}
+        )
+
+    mime_type, params = parse_options_header(content_type or "")
+    if mime_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ApplicationError("Expected a multipart/form-data upload", ErrorCode.VALIDATION_ERROR)
+
+    receiver = _UploadReceiver(max_size)
+    parser = MultipartParser(params[b"boundary"], receiver.callbacks)
+    try:
+        async for chunk in chunks:
+            parser.write(chunk)
+        parser.finalize()
+    except ApplicationError:
+        raise
+    except Exception as e:
+        raise ApplicationError(
+            "Malformed multipart upload",
+            ErrorCode.VALIDATION_ERROR,
+            {"original_error": str(e)}
+        )
+
+    if receiver.filename is None:
+        raise ApplicationError("No file was uploaded", ErrorCode.VALIDATION_ERROR)
+
+    logger.info(f"Received upload '{receiver.filename}' ({len(receiver.buffer)} bytes)")
+    return ReceivedUpload(receiver.filename, receiver.buffer, receiver.hasher.hexdigest(), receiver.fields)
@@ -0,0 +1,93 @@
+"""Bounded executor for running CPU-bound image work off the event loop."""
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.error_handling import ApplicationError, ErrorCode
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """
+    Run blocking ImageService calls in a thread or process pool.
+
+    At most `workers + queue_size` jobs are admitted at once; further requests
+    are rejected immediately with SERVICE_BUSY instead of piling up, so cheap
+    routes such as /api/health stay responsive while heavy jobs run. Admission
+    is tracked on the event loop thread, so no lock is needed.
+    """
+
+    def __init__(self, kind: str, workers: int, queue_size: int):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = self.workers + max(0, queue_size)
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so process workers are forked after app startup
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-worker")
+            logger.info(f"Started {self.kind} pool with {self.workers} worker(s)")
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        Raises:
+            ApplicationError: SERVICE_BUSY when the pool and its queue are full
+        """
+        if self._in_flight >= self.max_pending:
+            self.rejected += 1
+            raise ApplicationError(
+                "Server is busy processing other images, please retry shortly",
+                ErrorCode.SERVICE_BUSY,
+                {"in_flight": self._in_flight, "max_pending": self.max_pending}
+            )
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+        self.completed += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool occupancy and counters; completed counts successful jobs, failed those that raised."""
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self):
+        """Stop the executor, waiting for running jobs to finish."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Process-wide pool used by the API routes
+worker_pool = WorkerPool(settings.worker_pool_kind, settings.worker_pool_size, settings.worker_queue_size)
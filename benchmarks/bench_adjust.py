@@ -0,0 +1,103 @@
+"""
+Skin tone transfer: the original per-pixel HSV pipeline vs. the 3D colour LUT.
+
+"legacy" is what adjust_skin_tone used to do: full-image HSV conversion, a
+gather of the skin pixels, float64 scaling through fancy indexing and a
+conversion back to RGB. "lut" measures the skin's mean HSV, builds the tone
+LUT and applies it. Peak memory is the largest traced allocation while each
+variant runs. The difference columns compare the two outputs; they differ
+only near the skin mask's edge, which the LUT feathers across one grid cell.
+
+Before timing, the identity LUT is checked to reproduce every 8-bit level of
+every channel exactly; the script exits if it does not.
+
+Usage:
+    python benchmarks/bench_adjust.py [--megapixels 2 12 24] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from common import best_of, make_test_image
+
+from app.models.color_model import SkinTone
+from app.services.color_lut import TARGET_HSV, ColorLUT, build_tone_lut, identity_grid, skin_hsv_mean, tone_factors
+from app.services.image_loader import load_rgb
+from app.services.skin_mask import get_skin_table
+
+TARGET = SkinTone.DARK
+
+
+def legacy(image_rgb: np.ndarray) -> np.ndarray:
+    skin_mask = get_skin_table().lookup(image_rgb)
+    image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
+    target_hsv = np.array(TARGET_HSV[TARGET], dtype=np.uint8)
+    skin_pixels = np.where(skin_mask > 0)
+    skin_hsv = image_hsv[skin_pixels]
+    factors = [
+        target_hsv[channel] / np.mean(skin_hsv[:, channel]) if np.mean(skin_hsv[:, channel]) > 0 else 1
+        for channel in range(3)
+    ]
+    adjusted_hsv = image_hsv.copy()
+    adjusted_hsv[skin_pixels] = np.clip([
+        skin_hsv[:, 0] * factors[0],
+        np.clip(skin_hsv[:, 1] * factors[1], 0, 255),
+        np.clip(skin_hsv[:, 2] * factors[2], 0, 255),
+    ], 0, 255).transpose()
+    return cv2.cvtColor(adjusted_hsv, cv2.COLOR_HSV2RGB)
+
+
+def lut(image_rgb: np.ndarray) -> np.ndarray:
+    return build_tone_lut(tone_factors(skin_hsv_mean(image_rgb), TARGET)).apply(image_rgb)
+
+
+def check_identity() -> None:
+    """Exit unless the identity LUT maps every level of every channel to itself."""
+    identity = ColorLUT(identity_grid())
+    levels = np.arange(256, dtype=np.uint8)
+    for channel in range(3):
+        for other in (0, 128, 255):
+            image_rgb = np.full((1, 256, 3), other, dtype=np.uint8)
+            image_rgb[0, :, channel] = levels
+            wrong = np.flatnonzero((identity.apply(image_rgb) != image_rgb).any(axis=-1)[0])
+            if len(wrong):
+                raise SystemExit(
+                    f"identity LUT changes channel {channel} at levels {wrong.tolist()} (others at {other})"
+                )
+    print("identity LUT round-trips all 256 levels of every channel")
+
+
+def peak_mb(fn, image_rgb) -> float:
+    tracemalloc.start()
+    fn(image_rgb)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[2, 12, 24])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    check_identity()
+    get_skin_table()
+    print(f"{'MP':>5} {'variant':<7} {'ms':>8} {'peak MB':>8} {'mean diff':>10} {'>8 levels':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.megapixels:
+            image_rgb = load_rgb(make_test_image(os.path.join(tmp, "photo.jpg"), megapixels))
+            reference = legacy(image_rgb).astype(np.int16)
+            for name, fn in (("legacy", legacy), ("lut", lut)):
+                ms = best_of(lambda: fn(image_rgb), args.repeat)
+                diff = np.abs(fn(image_rgb).astype(np.int16) - reference)
+                print(f"{megapixels:5g} {name:<7} {ms:8.1f} {peak_mb(fn, image_rgb):8.1f} "
+                      f"{diff.mean():10.3f} {(diff.max(axis=-1) > 8).mean():10.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Bulk analysis throughput: detect_skin_tone in a loop vs. one detect_skin_tones call.
+
+"loop" runs the per-image pipeline (without its result cache) at the batch
+thumbnail size, so both variants look at the same number of pixels; "batch"
+stacks the thumbnails and classifies them together. Agreement is the share
+of images both variants put in the same SkinTone bucket.
+
+Usage:
+    python benchmarks/bench_batch.py [--images 200] [--megapixels 0.3] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+
+from common import best_of, make_test_image
+
+from app.core.config import settings
+from app.services.image_service import ImageService
+from app.services.skin_mask import get_skin_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--megapixels", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    size = settings.batch_thumbnail_size
+    get_skin_table()
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [
+            make_test_image(os.path.join(tmp, f"photo_{seed}.jpg"), args.megapixels, seed)
+            for seed in range(args.images)
+        ]
+        data = [open(path, "rb").read() for path in paths]
+
+        def loop():
+            return [ImageService._detect_skin_tone(item, size)[0] for item in data]
+
+        def batch():
+            return [skin_tone for skin_tone, _ in ImageService.detect_skin_tones(data, size)]
+
+        loop_ms = best_of(loop, args.repeat)
+        batch_ms = best_of(batch, args.repeat)
+        agreement = sum(a == b for a, b in zip(loop(), batch())) / len(data)
+
+    print(f"{args.images} images of {args.megapixels:g} MP, {size}px thumbnails")
+    print(f"{'variant':<6} {'ms':>9} {'images/s':>9}")
+    for name, ms in (("loop", loop_ms), ("batch", batch_ms)):
+        print(f"{name:<6} {ms:9.1f} {args.images / (ms / 1000):9.0f}")
+    print(f"bucket agreement: {agreement:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Decode count and wall time of the colour extraction front end of detect_skin_tone.
+
+"before" reproduces the original pipeline (cv2.imread + ColorThief(path) with
+separate get_color/get_palette calls); "after" is the shared-array path used by
+ImageService today (one decode, one vectorized palette pass).
+
+Usage:
+    python benchmarks/bench_decode.py [--megapixels 12] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+from collections import Counter
+
+import cv2
+from PIL import ImageFile
+import colorthief
+
+from common import best_of, make_test_image
+
+from app.services.image_loader import load_rgb
+from app.services.palette import extract_palette
+
+calls = Counter()
+
+
+def _counting(name, fn):
+    def wrapper(*args, **kwargs):
+        calls[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _install_counters():
+    """Count real decodes (cv2.imread, PIL file loads) and MMCQ quantizations."""
+    cv2.imread = _counting("cv2.imread", cv2.imread)
+
+    original_load = ImageFile.ImageFile.load
+
+    def load(self):
+        # Only count the call that actually decodes pixel data
+        if getattr(self, "tile", None):
+            calls["PIL decode"] += 1
+        return original_load(self)
+
+    ImageFile.ImageFile.load = load
+    colorthief.MMCQ.quantize = staticmethod(_counting("MMCQ.quantize", colorthief.MMCQ.quantize))
+
+
+def before(image_path: str):
+    image = cv2.imread(image_path)
+    image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    color_thief = colorthief.ColorThief(image_path)
+    dominant_color = color_thief.get_color(quality=1)
+    palette = color_thief.get_palette(color_count=5, quality=1)
+    return image_rgb, dominant_color, palette
+
+
+def after(image_path: str):
+    image_rgb = load_rgb(image_path)
+    palette = extract_palette(image_rgb, color_count=5)
+    return image_rgb, palette[0], palette
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _install_counters()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_test_image(os.path.join(tmp, "photo.jpg"), args.megapixels)
+
+        print(f"{args.megapixels:g} MP JPEG, best of {args.repeat}")
+        for name, fn in (("before", before), ("after", after)):
+            calls.clear()
+            fn(path)
+            counts = dict(calls)
+            elapsed = best_of(lambda: fn(path), args.repeat)
+            print(f"  {name:<7} {elapsed:9.1f} ms  {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Peak RSS and time of decoding a large JPEG for a bounded-resolution analysis.
+
+Each mode runs in a fresh interpreter so the peak RSS reflects that mode alone:
+
+    full     cv2.imread at full size, then cv2.resize to the target
+    reduced  header-driven IMREAD_REDUCED_COLOR_* decode, then the final resize
+
+Usage:
+    python benchmarks/bench_decode_memory.py [--megapixels 24] [--max-side 512]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_test_image
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM is per address space, so unlike ru_maxrss it doesn't carry over
+    # the parent's peak across exec
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child(mode: str, path: str, max_side: int):
+    from app.services.image_loader import load_rgb, load_rgb_bounded, resize_to_max_side
+
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "full":
+        image_rgb = resize_to_max_side(load_rgb(path), max_side)
+    else:
+        image_rgb = load_rgb_bounded(path, max_side)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(json.dumps({
+        "mode": mode,
+        "ms": elapsed,
+        "peak_rss_mb": _peak_rss_mb(),
+        "decode_rss_mb": _peak_rss_mb() - baseline,
+        "shape": list(image_rgb.shape),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24)
+    parser.add_argument("--max-side", type=int, default=512)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "MAX_SIDE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, path, max_side = args.child
+        child(mode, path, int(max_side))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_test_image(os.path.join(tmp, "photo.jpg"), args.megapixels)
+        print(f"{args.megapixels:g} MP JPEG, max side {args.max_side}")
+        print(f"{'mode':<8} {'ms':>8} {'peak RSS MB':>12} {'decode MB':>10}  output")
+        for mode in ("full", "reduced"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", mode, path, str(args.max_side)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<8} {result['ms']:8.1f} {result['peak_rss_mb']:12.1f} "
+                  f"{result['decode_rss_mb']:10.1f}  {result['shape']}")
+
+
+if __name__ == "__main__":
+    main()
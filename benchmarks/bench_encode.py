@@ -0,0 +1,52 @@
+"""
+Output encoding: fixed quality vs. quality searched for a target SSIM.
+
+For each format, "q90" encodes at the fixed default quality and "ssim=T"
+searches the lowest quality whose proxy SSIM meets T. "proxy" is the score
+the search measured on its tile mosaic, "full" the SSIM of the whole
+decoded image, which the proxy is meant to predict. Two test images are
+used: the noisy synthetic photo and a blurred copy that compresses easily.
+
+Usage:
+    python benchmarks/bench_encode.py [--megapixels 12] [--targets 0.95 0.98]
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from common import make_test_image
+
+from app.services.image_encoder import EncodeOptions, encode_image, ssim
+from app.services.image_loader import load_rgb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--targets", type=float, nargs="+", default=[0.95, 0.98])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        noisy = load_rgb(make_test_image(os.path.join(tmp, "photo.png"), args.megapixels))
+    images = {"noisy": noisy, "smooth": cv2.GaussianBlur(noisy, (0, 0), 2.5)}
+
+    print(f"{'image':<7} {'format':<5} {'variant':<10} {'quality':>7} {'KB':>8} {'ms':>7} {'proxy':>7} {'full':>7}")
+    for name, image_rgb in images.items():
+        reference = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+        for output_format in ("jpeg", "webp"):
+            variants = [("q90", EncodeOptions(output_format, 90))] + [
+                (f"ssim={target:g}", EncodeOptions(output_format, target_ssim=target)) for target in args.targets
+            ]
+            for label, options in variants:
+                encoded = encode_image(image_rgb, options)
+                decoded = cv2.imdecode(np.frombuffer(encoded.data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+                proxy = f"{encoded.ssim:7.4f}" if encoded.ssim is not None else f"{'-':>7}"
+                print(f"{name:<7} {output_format:<5} {label:<10} {encoded.quality:7d} {encoded.nbytes / 1024:8.0f} "
+                      f"{encoded.seconds * 1000:7.1f} {proxy} {ssim(reference, decoded):7.4f}")
+
+
+if __name__ == "__main__":
+    main()
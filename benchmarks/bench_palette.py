@@ -0,0 +1,62 @@
+"""
+Palette extraction cost: ColorThief (quality=1) vs. the vectorized MMCQ port.
+
+Both run on the same decoded array so only the palette step is measured. The
+"max diff" column is the largest per-channel difference between the two
+palettes (0 means identical output).
+
+Usage:
+    python benchmarks/bench_palette.py [--sizes 1 4 12 24] [--repeat 3] [--skip-colorthief]
+"""
+import argparse
+import os
+import tempfile
+
+from PIL import Image
+from colorthief import ColorThief
+
+from common import best_of, make_test_image
+
+from app.services.image_loader import load_rgb
+from app.services.palette import extract_palette
+
+
+def colorthief_palette(image_rgb):
+    color_thief = ColorThief.__new__(ColorThief)
+    color_thief.image = Image.fromarray(image_rgb)
+    return color_thief.get_palette(color_count=5, quality=1)
+
+
+def max_difference(palette_a, palette_b) -> int:
+    if len(palette_a) != len(palette_b):
+        return -1
+    return max(abs(a - b) for ca, cb in zip(palette_a, palette_b) for a, b in zip(ca, cb))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 12, 24], help="Image sizes in megapixels")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-colorthief", action="store_true", help="Only time the NumPy engine")
+    args = parser.parse_args()
+
+    print(f"{'MP':>5} {'colorthief ms':>14} {'numpy ms':>10} {'speedup':>8} {'max diff':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.sizes:
+            path = make_test_image(os.path.join(tmp, f"photo_{megapixels:g}.jpg"), megapixels)
+            image_rgb = load_rgb(path)
+
+            numpy_ms = best_of(lambda: extract_palette(image_rgb), args.repeat)
+            if args.skip_colorthief:
+                print(f"{megapixels:5g} {'-':>14} {numpy_ms:10.1f} {'-':>8} {'-':>9}")
+                continue
+
+            # ColorThief is slow enough that a single run is representative
+            colorthief_ms = best_of(lambda: colorthief_palette(image_rgb), 1)
+            diff = max_difference(colorthief_palette(image_rgb), extract_palette(image_rgb))
+            print(f"{megapixels:5g} {colorthief_ms:14.1f} {numpy_ms:10.1f} "
+                  f"{colorthief_ms / numpy_ms:7.1f}x {diff:9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Accuracy/speed trade-off of the bounded analysis resolution.
+
+For every image, detect_skin_tone runs once at full resolution and once per
+candidate cap; the report shows how far `lightness` drifts, how many images
+change SkinTone bucket, and the time per analysis at each cap.
+
+Usage:
+    python benchmarks/bench_resolution_drift.py [--images DIR] [--caps 256 512 1024]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from common import make_test_image
+
+from app.services.image_service import ImageService
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def collect_images(directory: str):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def timed_detect(path: str, max_side: int):
+    start = time.perf_counter()
+    skin_tone, metadata = ImageService.detect_skin_tone(path, max_side=max_side)
+    return skin_tone, metadata["lightness"], (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Directory of photos to evaluate (default: synthetic images)")
+    parser.add_argument("--caps", type=int, nargs="+", default=[256, 384, 512, 768, 1024])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.images:
+            paths = collect_images(args.images)
+        else:
+            paths = [make_test_image(os.path.join(tmp, f"photo_{i}.jpg"), 12, seed=i) for i in range(3)]
+
+        reference = {path: timed_detect(path, 0) for path in paths}
+        full_ms = sum(r[2] for r in reference.values()) / len(paths)
+
+        print(f"{len(paths)} images, full resolution: {full_ms:.1f} ms/image")
+        print(f"{'cap':>6} {'mean |dL*|':>11} {'max |dL*|':>10} {'bucket changes':>15} {'ms/image':>9}")
+        for cap in args.caps:
+            drifts, changes, elapsed = [], 0, 0.0
+            for path in paths:
+                skin_tone, lightness, ms = timed_detect(path, cap)
+                ref_tone, ref_lightness, _ = reference[path]
+                drifts.append(abs(lightness - ref_lightness))
+                changes += skin_tone != ref_tone
+                elapsed += ms
+            print(f"{cap:6d} {sum(drifts) / len(drifts):11.3f} {max(drifts):10.3f} "
+                  f"{changes:9d}/{len(paths):<5d} {elapsed / len(paths):9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Skin mask cost: colour conversion + cv2.inRange per rule vs. the RGB lookup table.
+
+"table" is the full 2^24-entry gather, built here for every rule so the two
+can be compared; "lookup" is what SkinTable.lookup() actually does, which
+compiles only composite rules and runs single-range rules directly.
+
+Usage:
+    python benchmarks/bench_skin_mask.py [--megapixels 0.2 12] [--repeat 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import best_of, make_test_image
+
+from app.services.image_loader import load_rgb
+from app.services.skin_mask import SKIN_RULES, SkinTable, get_skin_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.2, 12])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for rule_name in SKIN_RULES:
+        start = time.perf_counter()
+        compiled = get_skin_table(rule_name).table is not None
+        elapsed = f"built in {(time.perf_counter() - start) * 1000:.0f} ms" if compiled else "runs directly"
+        print(f"rule '{rule_name}' {elapsed}")
+
+    # Force a table for every rule, single-range ones included
+    tables = {}
+    for rule_name, rule in SKIN_RULES.items():
+        tables[rule_name] = SkinTable(lambda image_rgb, rule=rule: rule(image_rgb))
+
+    print(f"{'MP':>5} {'rule':<10} {'convert+inRange ms':>19} {'table ms':>9} {'lookup ms':>10} {'identical':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.megapixels:
+            image_rgb = load_rgb(make_test_image(os.path.join(tmp, "photo.jpg"), megapixels))
+            for rule_name, rule in SKIN_RULES.items():
+                table, compiled = tables[rule_name], get_skin_table(rule_name)
+                rule_ms = best_of(lambda: rule(image_rgb), args.repeat)
+                table_ms = best_of(lambda: table.lookup(image_rgb), args.repeat)
+                lookup_ms = best_of(lambda: compiled.lookup(image_rgb), args.repeat)
+                identical = np.array_equal(rule(image_rgb) > 0, table.lookup(image_rgb) > 0)
+                print(f"{megapixels:5g} {rule_name:<10} {rule_ms:19.2f} {table_ms:9.2f} {lookup_ms:10.2f} "
+                      f"{str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
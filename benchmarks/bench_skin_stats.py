@@ -0,0 +1,87 @@
+"""
+Skin statistics: the original multi-temporary pipeline vs. the fused kernel.
+
+"legacy" is what detect_skin_tone used to do: HSV conversion, cv2.inRange,
+cv2.bitwise_and into skin_only, np.where, a gather of the skin pixels, then
+np.mean. "gathered" gathers the skin pixels strip by strip and converts every
+one to Lab, as the kernel first did; it is the exact reference for the L*
+statistics. "fused" is skin_stats.skin_statistics, which builds them from a
+masked luminance histogram instead. Peak memory is the largest traced
+allocation above the input image while each variant runs.
+
+Usage:
+    python benchmarks/bench_skin_stats.py [--megapixels 0.2 4 12] [--repeat 10]
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+from typing import Tuple
+
+import cv2
+import numpy as np
+
+from common import best_of, make_test_image
+
+from app.services.image_loader import load_rgb
+from app.services.color_space import srgb_to_lab
+from app.services.skin_mask import get_skin_table
+from app.services.skin_stats import (
+    LIGHTNESS_BINS, histogram_percentile, lightness_bins, skin_statistics, strip_rows
+)
+
+
+def legacy(image_rgb: np.ndarray) -> Tuple[np.ndarray, float]:
+    image_hsv = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2HSV)
+    skin_mask = cv2.inRange(image_hsv, np.array([0, 20, 70], np.uint8), np.array([20, 255, 255], np.uint8))
+    skin_only = cv2.bitwise_and(image_rgb, image_rgb, mask=skin_mask)
+    skin_pixels = skin_only[np.where(skin_mask > 0)]
+    return np.mean(skin_pixels, axis=0), float("nan")
+
+
+def gathered(image_rgb: np.ndarray) -> Tuple[np.ndarray, float]:
+    table = get_skin_table()
+    rows = strip_rows(image_rgb.shape[1])
+    sums = np.zeros(3, dtype=np.int64)
+    histogram = np.zeros(LIGHTNESS_BINS, dtype=np.int64)
+    for top in range(0, image_rgb.shape[0], rows):
+        strip = image_rgb[top:top + rows]
+        skin_pixels = strip[table.lookup(strip) > 0]
+        sums += skin_pixels.sum(axis=0, dtype=np.int64)
+        histogram += np.bincount(lightness_bins(srgb_to_lab(skin_pixels)[:, 0]), minlength=LIGHTNESS_BINS)
+    return sums / histogram.sum(), histogram_percentile(histogram, 50)
+
+
+def fused(image_rgb: np.ndarray) -> Tuple[np.ndarray, float]:
+    stats = skin_statistics(image_rgb)
+    return stats.mean, stats.median_lightness
+
+
+def peak_mb(fn, image_rgb) -> float:
+    tracemalloc.start()
+    fn(image_rgb)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.2, 4, 12])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    get_skin_table()
+    print(f"{'MP':>5} {'variant':<8} {'ms':>8} {'peak MB':>8} {'median L*':>10}  mean RGB")
+    with tempfile.TemporaryDirectory() as tmp:
+        for megapixels in args.megapixels:
+            image_rgb = load_rgb(make_test_image(os.path.join(tmp, "photo.jpg"), megapixels))
+            for name, fn in (("legacy", legacy), ("gathered", gathered), ("fused", fused)):
+                ms = best_of(lambda: fn(image_rgb), args.repeat)
+                mean, median = fn(image_rgb)
+                print(f"{megapixels:5g} {name:<8} {ms:8.2f} {peak_mb(fn, image_rgb):8.1f} {median:10.3f}  "
+                      f"{np.round(mean, 3).tolist()}")
+
+
+if __name__ == "__main__":
+    main()
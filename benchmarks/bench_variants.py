@@ -0,0 +1,53 @@
+"""
+All seven skin tone variants: seven adjust_skin_tone calls vs. one variants call.
+
+"separate" calls adjust_skin_tone once per SkinTone, decoding, measuring the
+skin and writing each output independently. "variants" decodes and measures
+once, builds the seven LUTs together, applies them in one pass and encodes
+the outputs concurrently. The array cache is disabled, so neither variant
+reuses a decode or skin measurement across calls or across repeats.
+
+Usage:
+    python benchmarks/bench_variants.py [--megapixels 2 12] [--repeat 3]
+"""
+import argparse
+import os
+import tempfile
+
+from common import best_of, make_test_image
+
+# Before the app is imported: the process-wide array cache reads its budget
+# once, and with it "separate" would share one decode across all seven tones
+os.environ["ARRAY_CACHE_BYTES"] = "0"
+
+from app.core.config import settings
+from app.models.color_model import SkinTone
+from app.services.image_service import ImageService
+from app.services.skin_mask import get_skin_table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[2, 12])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    get_skin_table()
+    print(f"{'MP':>5} {'variant':<8} {'ms':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.upload_folder = tmp
+        for megapixels in args.megapixels:
+            path = make_test_image(os.path.join(tmp, "photo.jpg"), megapixels)
+
+            def separate():
+                return {tone: ImageService.adjust_skin_tone(path, tone) for tone in SkinTone}
+
+            def variants():
+                return ImageService.adjust_skin_tone_variants(path)
+
+            for name, fn in (("separate", separate), ("variants", variants)):
+                print(f"{megapixels:5g} {name:<8} {best_of(fn, args.repeat):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import sys
+import time
+from typing import Callable, Tuple
+
+import cv2
+import numpy as np
+
+# Make the 'app' package importable when a script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def image_shape(megapixels: float) -> Tuple[int, int]:
+    """Return a 4:3 (height, width) pair for the given megapixel count."""
+    width = int(round((megapixels * 1e6 * 4 / 3) ** 0.5))
+    height = int(round(width * 3 / 4))
+    return height, width
+
+
+def make_test_image(path: str, megapixels: float, seed: int = 0) -> str:
+    """
+    Write a synthetic photo-like image: a skin-coloured blob on a textured background.
+
+    Args:
+        path: Destination file; the extension selects the format
+        megapixels: Image size in millions of pixels
+        seed: Random seed for the noise layer
+
+    Returns:
+        The path that was written
+    """
+    height, width = image_shape(megapixels)
+    rng = np.random.default_rng(seed)
+
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    background = np.dstack([
+        90 + 60 * xx / width,
+        110 + 40 * yy / height,
+        140 - 50 * xx / width,
+    ])
+
+    # Elliptical "face" in a medium skin tone, BGR order for cv2.imwrite
+    cy, cx = height / 2, width / 2
+    inside = ((yy - cy) / (height * 0.35)) ** 2 + ((xx - cx) / (width * 0.25)) ** 2 <= 1
+    background[inside] = (120, 150, 200)
+
+    noise = rng.normal(0, 6, size=(height, width, 3)).astype(np.float32)
+    image = np.clip(background + noise, 0, 255).astype(np.uint8)
+    cv2.imwrite(path, image)
+    return path
+
+
+def best_of(fn: Callable[[], object], repeat: int = 3) -> float:
+    """Run fn `repeat` times and return the fastest wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000